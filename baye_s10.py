@@ -63,49 +63,54 @@ Los primeros 6 datos corresponden al grupo de corredores, mientras que los resta
 """
 
 import numpy as np
-from numpy.random import gamma, multivariate_normal
-from numpy.linalg import inv
-import matplotlib.pyplot as plt
-import statsmodels.api as sm
-import statsmodels.stats.api as sms
-
-x_2 = np.append(np.zeros((1,6)), np.ones((1,6)))
-x_3 = np.array([23, 22, 22, 25, 27, 20, 31, 23, 27, 28, 22, 24])
-x_4 = x_2 * x_3
-
-x_2
-
-x_3
-
-x_4
-
-X = np.asmatrix([x_2, x_3, x_4]).T
-
-X
-
-Y = np.array([-0.87, -10.74, -3.27, -1.97, 7.50, -7.25, 17.05, 4.96, 10.40, 11.05, 0.26, 2.51]).reshape(-1,1)
-
-Y
-
-model_osl = sm.GLS(Y, sm.add_constant(X)).fit()
-model_osl.summary()
-
-# Grupo corredor
-m_1, b_1 = 2.09, -51.29
-# Grupo aeróbico
-m_2, b_2 = 1.77, -38.18
-
-
-dom = np.linspace(np.min(x_3), np.max(x_3))
-y_1 = m_1 * dom + b_1
-y_2 = m_2 * dom + b_2
-ci_1 = 1.96 * np.std(y_1)/np.sqrt(len(dom))
-ci_2 = 1.96 * np.std(y_2)/np.sqrt(len(dom))
-plt.scatter(x_3, Y, c=x_2)
-plt.plot(dom, y_1)
-plt.fill_between(dom, y_1-ci_1,y_1+ci_1, color='b', alpha=.15)
-plt.plot(dom, y_2);
-plt.fill_between(dom, y_2-ci_2,y_2+ci_2, color='y', alpha=.15);
+from numpy.random import gamma, standard_normal
+from numpy.linalg import cholesky, inv
+
+def oxygen_data():
+  """ Datos del ejemplo: indicadora del grupo aeróbico, edad, su interacción
+  y el cambio en el consumo máximo de oxígeno.
+
+  :return: Tupla ``(x_2, x_3, x_4, Y)``.
+  """
+  x_2 = np.append(np.zeros((1,6)), np.ones((1,6)))
+  x_3 = np.array([23, 22, 22, 25, 27, 20, 31, 23, 27, 28, 22, 24])
+  x_4 = x_2 * x_3
+  Y = np.array([-0.87, -10.74, -3.27, -1.97, 7.50, -7.25, 17.05, 4.96, 10.40, 11.05, 0.26, 2.51]).reshape(-1,1)
+  return x_2, x_3, x_4, Y
+
+def demo_ols():
+  import matplotlib.pyplot as plt
+  import statsmodels.api as sm
+
+  x_2, x_3, x_4, Y = oxygen_data()
+  print(x_2)
+  print(x_3)
+  print(x_4)
+
+  X = np.asmatrix([x_2, x_3, x_4]).T
+  print(X)
+  print(Y)
+
+  model_osl = sm.GLS(Y, sm.add_constant(X)).fit()
+  print(model_osl.summary())
+
+  # Grupo corredor
+  m_1, b_1 = 2.09, -51.29
+  # Grupo aeróbico
+  m_2, b_2 = 1.77, -38.18
+
+
+  dom = np.linspace(np.min(x_3), np.max(x_3))
+  y_1 = m_1 * dom + b_1
+  y_2 = m_2 * dom + b_2
+  ci_1 = 1.96 * np.std(y_1)/np.sqrt(len(dom))
+  ci_2 = 1.96 * np.std(y_2)/np.sqrt(len(dom))
+  plt.scatter(x_3, Y, c=x_2)
+  plt.plot(dom, y_1)
+  plt.fill_between(dom, y_1-ci_1,y_1+ci_1, color='b', alpha=.15)
+  plt.plot(dom, y_2);
+  plt.fill_between(dom, y_2-ci_2,y_2+ci_2, color='y', alpha=.15);
+  return X, Y
 
 """#### Usando estimación bayesiana
 
@@ -179,52 +184,72 @@ Note que no es necesario usar MCMC para simular las muestras, porque para genera
 y dar el estimador de Monte Carlo.
 """
 
-sample_size = 1000
-g = 12
-n = 12
-p = 12
-nu_0 = 1
-sigma_0_2 = 8.54
-
-_X = np.hstack((np.ones([X.shape[0], 1], X.dtype), X))
-SSR_g = Y.T * ( np.eye(p) - (g / (g+1) ) * _X * inv(_X.T * _X) * _X.T ) * Y
-
-sample = {"sigma2": [], "beta": []}
-
-shape_g = (nu_0 + n) / 2
-rate_g = (nu_0 * sigma_0_2 + SSR_g) / 2
-mean_n = (g / (g + 1)) * model_osl.params
-cov_n = ((g / (g + 1)) * inv(_X.T * _X))
-
-for i in range(sample_size):
-  _sigma2 = 1 / gamma(shape=shape_g, scale=1/rate_g)[0][0]
-  _beta = multivariate_normal(mean=mean_n, cov=_sigma2*cov_n)
-  sample["sigma2"].append(_sigma2)
-  sample["beta"].append([_beta[0], _beta[1], _beta[2], _beta[3]])
-
-sample["beta"] = np.array(sample["beta"])
-
-plt.hist(sample["sigma2"], density=True);
-
-fig, axs = plt.subplots(4, figsize=(10, 9))
-fig.suptitle('Betas')
-for i in range(4):
-  print(np.mean(sample["beta"][:,i]))
-  axs[i].hist(sample["beta"][:,i], bins=30)
-
-fig, axs = plt.subplots(1,4, figsize=(10, 5))
-for i in range(4):
-  axs[i].boxplot(sample["beta"][:,i])
-
-fig, ax = plt.subplots(figsize=(12, 5))
-
-beta_2 = sample["beta"][:, 1]
-beta_4 = sample["beta"][:, 3]
-
-data = [beta_2 + beta_4 * age for age in x_3]
-
-plt.axhline(0, color="gray")
-ax.boxplot(data, positions=x_3, meanline=True);
+def g_prior_sample(X, Y, g, nu_0, sigma_0_2, sample_size):
+  """ Muestra de $p(\\sigma^{2}, \\beta | \\mathbf{y}, \\mathbf{X})$ con la
+  inicial g de Zellner, siguiendo los pasos 1 y 2 de arriba para todas las
+  observaciones a la vez.
+
+  :param X: Matriz de diseño (n, p), incluida la columna de unos.
+  :param Y: Respuestas (n,) o (n, 1).
+  :param g: Parámetro $g$ de la inicial.
+  :param nu_0: Grados de libertad iniciales de $\\sigma^{2}$.
+  :param sigma_0_2: Escala inicial de $\\sigma^{2}$.
+  :param sample_size: Tamaño de la muestra.
+  :return: Diccionario con ``"sigma2"`` (sample_size,) y ``"beta"``
+    (sample_size, p).
+  """
+  X = np.asarray(X, dtype=float)
+  Y = np.asarray(Y, dtype=float).ravel()
+  n, p = X.shape
+
+  XtX_inv = inv(X.T @ X)
+  beta_ols = XtX_inv @ X.T @ Y
+  SSR_g = Y @ Y - (g / (g + 1)) * Y @ X @ beta_ols
+
+  shape_g = (nu_0 + n) / 2
+  rate_g = (nu_0 * sigma_0_2 + SSR_g) / 2
+  mean_n = (g / (g + 1)) * beta_ols
+  cov_n = (g / (g + 1)) * XtX_inv
+
+  sigma2 = 1 / gamma(shape=shape_g, scale=1/rate_g, size=sample_size)
+  z = standard_normal((sample_size, p)) @ cholesky(cov_n).T
+  beta = mean_n + np.sqrt(sigma2)[:, None] * z
+  return {"sigma2": sigma2, "beta": beta}
+
+def demo_g_prior(X, Y):
+  import matplotlib.pyplot as plt
+
+  sample_size = 1000
+  g = 12
+  nu_0 = 1
+  sigma_0_2 = 8.54
+
+  x_3 = oxygen_data()[1]
+  _X = np.hstack((np.ones([X.shape[0], 1], X.dtype), X))
+  sample = g_prior_sample(_X, Y, g, nu_0, sigma_0_2, sample_size)
+
+  plt.hist(sample["sigma2"], density=True);
+
+  fig, axs = plt.subplots(4, figsize=(10, 9))
+  fig.suptitle('Betas')
+  for i in range(4):
+    print(np.mean(sample["beta"][:,i]))
+    axs[i].hist(sample["beta"][:,i], bins=30)
+
+  fig, axs = plt.subplots(1,4, figsize=(10, 5))
+  for i in range(4):
+    axs[i].boxplot(sample["beta"][:,i])
+
+  fig, ax = plt.subplots(figsize=(12, 5))
+
+  beta_2 = sample["beta"][:, 1]
+  beta_4 = sample["beta"][:, 3]
+
+  data = [beta_2 + beta_4 * age for age in x_3]
+
+  plt.axhline(0, color="gray")
+  ax.boxplot(data, positions=x_3, meanline=True);
+  return sample
 
 """_Tarea moral_: Graficar las regresiones tanto para el grupo corredor como para el aeróbico con sus intervalos de confianza y compararlo con la regresión por mínimos cuadrados.
 
@@ -232,4 +257,13 @@ ax.boxplot(data, positions=x_3, meanline=True);
 1. A First Course in Bayesian Statistical Methods - Springer
 2. The Bayesian Choide - Springer
 3. Bayesian Computations with R - Springer
-"""
\ No newline at end of file
+"""
+
+
+def main():
+  X, Y = demo_ols()
+  demo_g_prior(X, Y)
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""Muestreadores y modelos del repositorio como un solo paquete importable.
+
+Los nombres se resuelven la primera vez que se usan (PEP 562), así que
+``from bayes import Metropolis`` solo importa ``bayesiana_3`` y no carga
+matplotlib, pandas ni statsmodels: las exportaciones de Colab dejan sus
+gráficas y ejemplos en funciones ``demo_*`` que se corren con ``main()``.
+
+Los módulos siguen siendo de primer nivel en la raíz del repositorio (los
+notebooks y los scripts los importan por su nombre, y entre ellos se
+importan igual, p. ej. ``from hmc import effective_sample_size``), así que
+el paquete solo funciona con la raíz en ``sys.path``: corriendo desde ella
+o con ``PYTHONPATH`` apuntando a ella.
+"""
+
+import importlib
+
+_EXPORTS = {
+    # Exportaciones de los notebooks de Colab.
+    "posterior_discrete": "bayesiana_ejemplo1",
+    "beta_select": "bayesiana_ejemplo1",
+    "experiment_pi": "bayesiana_2",
+    "experiment_2": "bayesiana_2",
+    "RejectingSampler": "bayesiana_2",
+    "BetaSampler": "bayesiana_2",
+    "NormalSampler": "bayesiana_2",
+    "ImportanceSampler": "bayesiana_2",
+    "GammaInvIS": "bayesiana_2",
+    "Metropolis": "bayesiana_3",
+    "NormalMetropolis": "bayesiana_3",
+    "g_prior_sample": "baye_s10",
+    # Módulos vectorizados.
+    "GridPosterior": "grid_posterior",
+    "posterior_discrete_batch": "grid_posterior",
+    "BetaBinomial": "beta_binomial",
+    "BetaSelector": "beta_select",
+    "beta_select_batch": "beta_select",
+    "NormalMixtureGibbs": "mixture_gibbs",
+    "CollapsedNormalMixtureGibbs": "mixture_gibbs",
+    "GaussianMixtureEM": "gmm_em",
+    "OnlineGaussianMixtureEM": "gmm_em",
+    "DLM": "dlm",
+    "dlm_mod_poly": "dlm",
+    "dlm_filter": "dlm",
+    "dlm_smooth": "dlm",
+    "dlm_forecast": "dlm",
+    "dlm_bsample": "dlm",
+    "dlm_gibbs_dig": "dlm",
+    "dlm_mle": "dlm",
+    "dlm_mle_batch": "dlm",
+    "BayesLogisticRegression": "logistic_bayes",
+    "PoissonGammaExposure": "poisson_gamma",
+    "HMC": "hmc",
+    "NUTS": "hmc",
+    "effective_sample_size": "hmc",
+    "TemperedSMC": "smc",
+    "pca_gram": "pca",
+    "randomized_pca": "pca",
+    "IncrementalPCA": "pca",
+    "PolynomialRegressionSweep": "regression_sweep",
+    "WeibullLikelihood": "weibull",
+    "metropolis_kernel": "jit_backend",
+    "rejection_kernel": "jit_backend",
+    "importance_kernel": "jit_backend",
+    "profile_metropolis": "instrument",
+    "profile_rejection": "instrument",
+    "profile_importance": "instrument",
+    "load_columns": "bayes_datasets",
+    "PosteriorDraws": "draws",
+    "PosteriorService": "posterior_service",
+    "MemoCache": "memo_cache",
+    "memoize": "memo_cache",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    try:
+        value = getattr(importlib.import_module(module), name)
+    except ModuleNotFoundError as e:
+        if e.name != module:
+            raise
+        raise ImportError(
+            f"bayes.{name} vive en el módulo {module!r} de la raíz del "
+            "repositorio, que debe estar en sys.path") from e
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
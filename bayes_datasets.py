@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""Registro de datos con caché binaria por columna.
+
+Los análisis vuelven a leer IFNNY.csv, datos_aviones.csv, ballenas.csv y
+galaxy.txt como texto cada vez. Aquí cada fuente se lee una sola vez y cada
+columna se guarda como un ``.npy`` con su tipo (enteros, flotantes o texto)
+en ``CACHE_DIR``, junto con un ``meta.json`` que describe la fuente. Las
+lecturas siguientes abren las columnas con ``np.load(mmap_mode="r")``, así
+que no se copia nada a memoria hasta que se usa y los arreglos son de solo
+lectura.
+
+La caché se invalida si cambia la fuente:
+
+- ``validate="mtime"`` (por defecto) compara la fecha de modificación y el
+  tamaño;
+- ``validate="hash"`` compara el SHA-256 del contenido cuando cambió la
+  fecha (más lento, pero no depende de las fechas, p. ej. tras un
+  ``git checkout``); si el contenido es el mismo se actualiza la fecha
+  guardada para no volver a calcular el hash.
+
+Cada combinación de fuente y opciones de lectura (``names``,
+``skip_header``, ``delimiter``) tiene su propio directorio de caché.
+
+El ``meta.json`` se escribe al final y de forma atómica, de modo que una
+escritura interrumpida solo provoca que se vuelva a leer el texto.
+"""
+
+from collections import namedtuple
+import hashlib
+import json
+import os
+
+import numpy as np
+
+CACHE_DIR = ".npy_cache"
+
+DatasetSpec = namedtuple("DatasetSpec", "path names skip_header")
+
+DATASETS = {
+    "ifnny": DatasetSpec("IFNNY.csv", None, 0),
+    "aviones": DatasetSpec("datos_aviones.csv", None, 0),
+    "ballenas": DatasetSpec("ballenas.csv", ("t", "x"), 1),
+    # Como en GibbsSample_MixNorm.ipynb, el primer renglón se omite.
+    "galaxy": DatasetSpec(
+        "raw.githubusercontent.com/LeobardoEnriquezH/Data/main/galaxy.txt",
+        ("x",), 1),
+}
+
+
+def _sha256(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _cache_path(path, options, cache_dir):
+    """ Directorio de la caché de ``path``: nombre del archivo más un prefijo
+    del hash de su ruta absoluta y de las opciones de lectura.
+    """
+    key = json.dumps([os.path.abspath(path), options])
+    digest = hashlib.sha1(key.encode()).hexdigest()[:12]
+    return os.path.join(cache_dir, f"{os.path.basename(path)}-{digest}")
+
+
+def _source_info(path, with_hash):
+    st = os.stat(path)
+    info = {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+    if with_hash:
+        info["sha256"] = _sha256(path)
+    return info
+
+
+def _check(meta, path, options, validate):
+    """ Valida la caché contra la fuente.
+
+    :return: ``"valid"``, ``"stale"`` o ``"touched"`` (fecha distinta pero
+        mismo contenido, solo con ``validate="hash"``).
+    """
+    if meta.get("options") != options:
+        return "stale"
+    info = _source_info(path, with_hash=False)
+    if meta["source"]["size"] != info["size"]:
+        return "stale"
+    if meta["source"]["mtime_ns"] == info["mtime_ns"]:
+        return "valid"
+    if validate == "hash" and meta["source"].get("sha256") == _sha256(path):
+        return "touched"
+    return "stale"
+
+
+def _parse(path, names, skip_header, delimiter):
+    """ Lee el texto con ``np.genfromtxt`` infiriendo el tipo de cada
+    columna.
+    """
+    table = np.genfromtxt(path, delimiter=delimiter, dtype=None,
+                          encoding="utf-8", skip_header=skip_header,
+                          names=True if names is None else list(names))
+    return {name: np.ascontiguousarray(table[name])
+            for name in table.dtype.names}
+
+
+def _write_cache(directory, columns, source, options):
+    os.makedirs(directory, exist_ok=True)
+    for name, values in columns.items():
+        np.save(os.path.join(directory, name + ".npy"), values)
+    _write_meta(directory, {
+        "source": source, "options": options, "columns": list(columns),
+        "dtypes": {name: values.dtype.str
+                   for name, values in columns.items()}})
+
+
+def _write_meta(directory, meta):
+    tmp = os.path.join(directory, "meta.json.tmp")
+    with open(tmp, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp, os.path.join(directory, "meta.json"))
+
+
+def load_columns(path, names=None, skip_header=0, delimiter=",",
+                 cache_dir=CACHE_DIR, validate="mtime", refresh=False):
+    """ Columnas de un archivo de texto delimitado, a través de la caché.
+
+    :param path: Ruta de la fuente.
+    :param names: Nombres de las columnas; si es ``None`` se toman del
+        encabezado.
+    :param skip_header: Renglones que se omiten antes de los datos (o del
+        encabezado).
+    :param delimiter: Separador.
+    :param cache_dir: Directorio de la caché.
+    :param validate: ``"mtime"`` o ``"hash"``.
+    :param refresh: Si se vuelve a leer la fuente aunque la caché sea válida.
+    :return: Diccionario columna -> arreglo ``np.memmap`` de solo lectura,
+        en el orden de la fuente.
+    """
+    if validate not in ("mtime", "hash"):
+        raise ValueError(f"validate debe ser 'mtime' o 'hash', no {validate!r}")
+    options = {"names": None if names is None else list(names),
+               "skip_header": skip_header, "delimiter": delimiter}
+    directory = _cache_path(path, options, cache_dir)
+    meta_path = os.path.join(directory, "meta.json")
+    meta = None
+    if not refresh and os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+        state = _check(meta, path, options, validate)
+        if state == "touched":
+            meta["source"] = _source_info(path, with_hash=False) | {
+                "sha256": meta["source"]["sha256"]}
+            _write_meta(directory, meta)
+        elif state == "stale":
+            meta = None
+    if meta is None:
+        source = _source_info(path, with_hash=True)
+        columns = _parse(path, names, skip_header, delimiter)
+        _write_cache(directory, columns, source, options)
+        meta = {"columns": list(columns)}
+    return {name: np.load(os.path.join(directory, name + ".npy"), mmap_mode="r")
+            for name in meta["columns"]}
+
+
+def load(name, cache_dir=CACHE_DIR, validate="mtime", refresh=False):
+    """ Columnas de un conjunto de datos registrado en ``DATASETS``.
+
+    :param name: ``"ifnny"``, ``"aviones"``, ``"ballenas"`` o ``"galaxy"``.
+    :return: Diccionario columna -> arreglo de solo lectura.
+    """
+    spec = DATASETS[name]
+    return load_columns(spec.path, spec.names, spec.skip_header,
+                        cache_dir=cache_dir, validate=validate, refresh=refresh)
+
+
+def clear_cache(cache_dir=CACHE_DIR):
+    """ Borra los archivos de la caché (solo los ``.npy`` y ``meta.json``). """
+    if not os.path.isdir(cache_dir):
+        return
+    for entry in os.listdir(cache_dir):
+        directory = os.path.join(cache_dir, entry)
+        for name in os.listdir(directory):
+            if name.endswith(".npy") or name.startswith("meta.json"):
+                os.remove(os.path.join(directory, name))
+        os.rmdir(directory)
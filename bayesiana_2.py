@@ -70,12 +70,20 @@ Esta última igualdad la sabemos por proba geométrica.
 Lo interesante de esto es que usando $4\frac{\sum_{k=1}^{n}X_k}{n}$ podemos estimar $\pi$ con probabilidad 1.
 """
 
+import functools
+import importlib
+
 import numpy as np
-import matplotlib.pyplot as plt
 from abc import abstractmethod, ABC
-from scipy.special import beta
-from scipy.stats import beta as fbeta
-from scipy.stats import norm, gamma
+
+@functools.cache
+def _scipy(name):
+  """ Importa ``name`` (p. ej. ``"scipy.special"``) la primera vez que se
+  pide y regresa el mismo módulo después: las densidades y propuestas se
+  llaman en cada paso de los muestreadores y no deben pagar el import cada
+  vez, pero el módulo se puede importar sin scipy.
+  """
+  return importlib.import_module(name)
 
 def experiment_pi(n: int):
   u_1 = np.random.uniform(-1, 1, size=n)
@@ -91,13 +99,11 @@ def experiment_pi(n: int):
   p = 4 * np.mean(x)
   return p
 
-experiment_pi(10)
-
-experiment_pi(1000)
-
-experiment_pi(100000)
-
-experiment_pi(10000000)
+def demo_experiment_pi():
+  print(experiment_pi(10))
+  print(experiment_pi(1000))
+  print(experiment_pi(100000))
+  print(experiment_pi(10000000))
 
 """Lo malo: la convergencia es muy lenta i.e el error es del orden de $\frac{1}{\sqrt{N}}$ [MONTE CARLO SIMULATIONS](https://cse.engineering.nyu.edu/~mleung/CS909/s04/mc4.pdf)
 
@@ -132,13 +138,11 @@ def experiment_2(n: int):
   x = 4 * np.sqrt(1 - u ** 2)
   return np.mean(x)
 
-experiment_2(10)
-
-experiment_2(1000)
-
-experiment_2(100000)
-
-experiment_2(10000000)
+def demo_experiment_2():
+  print(experiment_2(10))
+  print(experiment_2(1000))
+  print(experiment_2(100000))
+  print(experiment_2(10000000))
 
 """Lo malo: este método también tiene un error del orden de $\frac{1}{\sqrt{N}}$ [MONTE CARLO SIMULATIONS](https://cse.engineering.nyu.edu/~mleung/CS909/s04/mc4.pdf)
 
@@ -238,7 +242,7 @@ def f_obj(x) -> float:
   if x < 0 or x > 1:
     return 0
 
-  cons = 1 / beta(a, b)
+  cons = 1 / _scipy("scipy.special").beta(a, b)
   ker = x ** (a - 1)
   ker *= (1 - x) ** (b - 1)
 
@@ -250,16 +254,20 @@ def f_prop(x):
     return 0
   return 1
 
-beta_sampler = BetaSampler(f_obj, f_prop, 5)
-sample, rate = beta_sampler.rejection_sampling(100000)
+def demo_beta_sampler():
+  import matplotlib.pyplot as plt
+  from scipy.stats import beta as fbeta
+
+  beta_sampler = BetaSampler(f_obj, f_prop, 5)
+  sample, rate = beta_sampler.rejection_sampling(100000)
 
-print("Tasa de aceptación: ", rate)
+  print("Tasa de aceptación: ", rate)
 
-dom = np.linspace(0, 1)
-f_beta = fbeta.pdf(dom, 5, 5)
-plt.plot(dom, f_beta, label="Densidad Beta(5,5)")
-plt.legend()
-plt.hist(sample, density=True, bins=50);
+  dom = np.linspace(0, 1)
+  f_beta = fbeta.pdf(dom, 5, 5)
+  plt.plot(dom, f_beta, label="Densidad Beta(5,5)")
+  plt.legend()
+  plt.hist(sample, density=True, bins=50);
 
 """_Ejercicio_: Generar una muestra de una distribución $\mathcal{N}(0,1)$.
 
@@ -295,16 +303,20 @@ def f_prop_norm(x):
     return 0
   return 1
 
-normal_sampler = NormalSampler(f_obj_norm, f_prop_norm, 4)
-sample, rate = normal_sampler.rejection_sampling(10000)
+def demo_normal_sampler():
+  import matplotlib.pyplot as plt
+  from scipy.stats import norm
 
-print("Tasa de aceptación: ", rate)
+  normal_sampler = NormalSampler(f_obj_norm, f_prop_norm, 4)
+  sample, rate = normal_sampler.rejection_sampling(10000)
 
-dom = np.linspace(-5, 5)
-f_norm = norm.pdf(dom, 0, 1)
-plt.plot(dom, f_norm, label="Densidad N(0,1)")
-plt.legend()
-plt.hist(sample, density=True);
+  print("Tasa de aceptación: ", rate)
+
+  dom = np.linspace(-5, 5)
+  f_norm = norm.pdf(dom, 0, 1)
+  plt.plot(dom, f_norm, label="Densidad N(0,1)")
+  plt.legend()
+  plt.hist(sample, density=True);
 
 """Ref: [Simulation - Lecture 3 - Rejection Sampling](https://www.stats.ox.ac.uk/~rdavies/teaching/PartASSP/2020/lectures_latest/simulation_lecture3.pdf)
 
@@ -488,7 +500,7 @@ class GammaInvIS(ImportanceSampler):
   def draw_from_p_prop(self) -> float:
     """ Proponemos Gamma(1,2)
     """
-    x = gamma.rvs(2, scale=1)
+    x = _scipy("scipy.stats").gamma.rvs(2, scale=1)
     return x
 
 def h(theta):
@@ -507,9 +519,9 @@ def pi(theta):
 def p(theta):
   return 0.5 * np.exp(-theta/2)
 
-sampler_gi = GammaInvIS(h, f, pi, p)
-
-sampler_gi.compute_IS_estimator(1000)
+def demo_gamma_inv_is():
+  sampler_gi = GammaInvIS(h, f, pi, p)
+  print(sampler_gi.compute_IS_estimator(1000))
 
 """El resultado exacto es
 
@@ -518,13 +530,26 @@ $$
 $$
 """
 
-sample = np.array([0.57, 2.18, 1.78, 0.71, 0.97, 2.15, 3.09, 2.52, 0.71, 1.25])
-a = 1
-b = 2
-beta = 1
-n = sample.size
+def demo_exact_posterior_mean():
+  sample = np.array([0.57, 2.18, 1.78, 0.71, 0.97, 2.15, 3.09, 2.52, 0.71, 1.25])
+  a = 1
+  b = 2
+  beta = 1
+  n = sample.size
+
+  estimator = b + np.sum(np.power(sample, beta))
+  estimator /= a + n - 1
+  print(estimator)
+
+
+def main():
+  demo_experiment_pi()
+  demo_experiment_2()
+  demo_beta_sampler()
+  demo_normal_sampler()
+  demo_gamma_inv_is()
+  demo_exact_posterior_mean()
 
-estimator = b + np.sum(np.power(sample, beta))
-estimator /= a + n - 1
-print(estimator)
 
+if __name__ == "__main__":
+  main()
@@ -76,7 +76,6 @@ $$
 
 import numpy as np
 from abc import ABC, abstractmethod
-import matplotlib.pyplot as plt
 
 class Metropolis(ABC):
   def __init__(self, f_sampling, f_ini, sample):
@@ -134,12 +133,16 @@ def f_ini(theta):
 
   return f
 
-sample = np.array([8.3,8.9,10.9,10,10.6,10.1,10.1,8.8,8.9,10.2])
-normal_metropolis = NormalMetropolis(f_samp, f_ini, sample)
+def demo_normal_metropolis():
+  import matplotlib.pyplot as plt
 
-chain = normal_metropolis.run(1000, 0, 15, 10)
-plt.ylim([0,12])
-plt.plot(chain);
+  sample = np.array([8.3,8.9,10.9,10,10.6,10.1,10.1,8.8,8.9,10.2])
+  normal_metropolis = NormalMetropolis(f_samp, f_ini, sample)
+
+  chain = normal_metropolis.run(1000, 0, 15, 10)
+  plt.ylim([0,12])
+  plt.plot(chain);
+  return chain
 
 """### ¿Cómo saber si la cadena es "buena"?
 - Calcular correlación (menor correlación, mejor cadena)
@@ -153,3 +156,10 @@ plt.plot(chain);
 ## Algoritmo de Gibbs
 """
 
+
+def main():
+  demo_normal_metropolis()
+
+
+if __name__ == "__main__":
+  main()
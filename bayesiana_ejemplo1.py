@@ -70,32 +70,28 @@ Al normalizar estos pesos obtenemos probabilidades.
 """
 
 import numpy as np
-import matplotlib.pyplot as plt
-import pandas as pd
-import scipy.stats as stats
-from scipy.special import betainc
-from scipy.optimize import fsolve
 
+TICK_LABELS = [0.05, 0.15, 0.25, 0.35, 0.45, 0.55, 0.65, 0.75, 0.85, 0.95]
 
-np.set_printoptions(precision=2)
 
-# Espacio parametral
-p = np.linspace(0.05, 0.95, 10)
+def demo_discrete_prior():
+  import matplotlib.pyplot as plt
 
-p
+  # Espacio parametral
+  p = np.linspace(0.05, 0.95, 10)
+  print(p)
 
-prior = np.array([1, 5.2, 8, 7.2, 4.6, 2.1, 0.7, 0.1, 0, 0])
-prior /= np.sum(prior)
+  prior = np.array([1, 5.2, 8, 7.2, 4.6, 2.1, 0.7, 0.1, 0, 0])
+  prior /= np.sum(prior)
 
-# Distribución inicial sobre el espacio parametral
-prior
+  # Distribución inicial sobre el espacio parametral
+  print(prior)
+  print(np.sum(prior))
 
-np.sum(prior)
-
-plt.bar(p, prior, width=0.05,
-        tick_label=[0.05, 0.15, 0.25, 0.35, 0.45, 0.55, 0.65, 0.75, 0.85, 0.95],
-        label="Distribución inicial")
-plt.legend();
+  plt.bar(p, prior, width=0.05, tick_label=TICK_LABELS,
+          label="Distribución inicial")
+  plt.legend();
+  return p, prior
 
 """En nuestro ejemplo, $s=11$ y $f=16$, por lo que la verosimilitud (distribución muestral/sampling distribution) es
 $$
@@ -123,37 +119,35 @@ def posterior_discrete(p, prior, data):
 
   return post
 
-data = np.array([11, 16])
-post = posterior_discrete(p, prior, data)
+def demo_discrete_posterior(p, prior):
+  import matplotlib.pyplot as plt
+  import pandas as pd
 
-plt.bar(p, post, width=0.05,
-        tick_label=[0.05, 0.15, 0.25, 0.35, 0.45, 0.55, 0.65, 0.75, 0.85, 0.95],
-        label="Distribución final")
-plt.legend();
+  data = np.array([11, 16])
+  post = posterior_discrete(p, prior, data)
 
-table = pd.DataFrame({"p": p,
-                      "Inicial": prior,
-                      "Final": post})
+  plt.bar(p, post, width=0.05, tick_label=TICK_LABELS,
+          label="Distribución final")
+  plt.legend();
 
-table
+  table = pd.DataFrame({"p": p,
+                        "Inicial": prior,
+                        "Final": post})
+  print(table)
 
-fig, axs = plt.subplots(2, 1, layout='constrained', figsize=(5, 5))
-_ = axs[0].bar(p, prior, width=0.05,
-               tick_label=[0.05, 0.15, 0.25, 0.35, 0.45, 0.55, 0.65, 0.75, 0.85, 0.95],
-               color="red")
-_ = axs[0].set_title("Distribución inicial")
-_ = axs[1].bar(p, post, width=0.05,
-               tick_label=[0.05, 0.15, 0.25, 0.35, 0.45, 0.55, 0.65, 0.75, 0.85, 0.95],
-               color="green")
-_ = axs[1].set_title("Distribución final")
+  fig, axs = plt.subplots(2, 1, layout='constrained', figsize=(5, 5))
+  _ = axs[0].bar(p, prior, width=0.05, tick_label=TICK_LABELS, color="red")
+  _ = axs[0].set_title("Distribución inicial")
+  _ = axs[1].bar(p, post, width=0.05, tick_label=TICK_LABELS, color="green")
+  _ = axs[1].set_title("Distribución final")
+  return post
 
 """Nótese que luego de actualizar la densidad, el conjunto de valores $\{0.25, 0.35, 0.45\}$ tienen una probabilidad posterior de $0.940$"""
 
-np.sum(post)
-
-p[2:5]
-
-np.sum(post[2:5])
+def demo_discrete_mass(p, post):
+  print(np.sum(post))
+  print(p[2:5])
+  print(np.sum(post[2:5]))
 
 """*Inicial beta*
 
@@ -181,6 +175,7 @@ Lo anterior se resume a que el cuantil $0.5$ (la mediana) es $0.3$, y el cuantil
 """
 
 def _beta_select_equation(params, p1, x1, p2, x2):
+    from scipy.special import betainc
     return betainc(*params, [x1, x2]) - [p1, p2]
 
 
@@ -193,6 +188,7 @@ def beta_select(p1, x1, p2, x2):
     :param p2: orden del segundo cuantil.
     :param x2: segundo cuantil.
     """
+    from scipy.optimize import fsolve
     params, info, status, mesg = fsolve(_beta_select_equation, [1, 1],
                                         args=(p1, x1, p2, x2), xtol=1e-12,
                                         full_output=True)
@@ -200,9 +196,10 @@ def beta_select(p1, x1, p2, x2):
         raise RuntimeError(f'fsolve failed: {mesg}')
     return params
 
-a, b = beta_select(0.5, 0.3, 0.9, 0.5)
-
-a, b
+def demo_beta_prior():
+  a, b = beta_select(0.5, 0.3, 0.9, 0.5)
+  print(a, b)
+  return a, b
 
 """Es decir,
 $$
@@ -235,13 +232,29 @@ $$
 $$
 """
 
-dom = np.linspace(0, 1, 10000)
-a_, b_ = 14.26, 23.18
+def demo_beta_posterior(a, b):
+  import matplotlib.pyplot as plt
+  import scipy.stats as stats
+
+  dom = np.linspace(0, 1, 10000)
+  a_, b_ = 14.26, 23.18
+
+  prior_beta = stats.beta.pdf(dom, a, b)
+  posterior_beta = stats.beta.pdf(dom, a_, b_)
+
+  _ = plt.plot(dom, prior_beta, label="Prior")
+  _ = plt.plot(dom, posterior_beta, label="Posterior")
+  _ = plt.legend()
+
 
-prior_beta = stats.beta.pdf(dom, a, b)
-posterior_beta = stats.beta.pdf(dom, a_, b_)
+def main():
+  np.set_printoptions(precision=2)
+  p, prior = demo_discrete_prior()
+  post = demo_discrete_posterior(p, prior)
+  demo_discrete_mass(p, post)
+  a, b = demo_beta_prior()
+  demo_beta_posterior(a, b)
 
-_ = plt.plot(dom, prior_beta, label="Prior")
-_ = plt.plot(dom, posterior_beta, label="Posterior")
-_ = plt.legend()
 
+if __name__ == "__main__":
+  main()
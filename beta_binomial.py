@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""Actualización conjugada Beta-Binomial para muchas proporciones a la vez.
+
+Si $p \\sim \\mathcal{Beta}(a, b)$ y se observan $s$ éxitos y $f$ fracasos,
+entonces $p | x \\sim \\mathcal{Beta}(a+s, b+f)$ (ver bayesiana_ejemplo1.py).
+Aquí se guardan los hiperparámetros de millones de proporciones independientes
+en dos arreglos ``a`` y ``b`` y los resúmenes posteriores se calculan en forma
+cerrada, sin evaluar densidades en una rejilla.
+
+Ejemplo::
+
+    model = BetaBinomial(3.26, 7.18, size=3)
+    model.update([11, 0, 5], [16, 2, 5])
+    model.mean()                    # [0.38, ...]
+    model.credible_interval(0.95)   # (3, 2)
+    model.prob_greater(0.5)         # P(p > 0.5 | x)
+"""
+
+import numpy as np
+from scipy.special import betainc, betaincinv
+
+
+class BetaBinomial:
+    def __init__(self, a, b, size=None):
+        """ Constructor del modelo conjugado.
+
+        :param a: Primer hiperparámetro de la inicial beta (escalar o arreglo).
+        :param b: Segundo hiperparámetro de la inicial beta (escalar o arreglo).
+        :param size: Número de proporciones. Si es ``None`` se toma del tamaño
+            de ``a`` y ``b``.
+        """
+        if size is None:
+            size = np.broadcast(np.asarray(a), np.asarray(b)).shape
+        self.a = np.array(np.broadcast_to(a, size), dtype=float)
+        self.b = np.array(np.broadcast_to(b, size), dtype=float)
+
+    def __len__(self):
+        return self.a.size
+
+    def update(self, successes, failures, idx=None):
+        """ Actualiza en su lugar los hiperparámetros con conteos observados.
+
+        :param successes: Número de éxitos.
+        :param failures: Número de fracasos.
+        :param idx: Índices de las proporciones a las que corresponden los
+            conteos. Si es ``None`` los conteos se aplican a todas (deben tener
+            la forma de ``a``). Los índices pueden repetirse.
+        :return: La misma instancia.
+        """
+        if idx is None:
+            self.a += successes
+            self.b += failures
+        else:
+            np.add.at(self.a, idx, successes)
+            np.add.at(self.b, idx, failures)
+        return self
+
+    def update_events(self, idx, outcomes):
+        """ Actualiza con un lote de eventos individuales de un flujo.
+
+        :param idx: Arreglo de enteros con la proporción de cada evento.
+        :param outcomes: Arreglo con 1 (éxito) o 0 (fracaso) por evento.
+        :return: La misma instancia.
+        """
+        idx = np.asarray(idx, dtype=np.intp)
+        outcomes = np.asarray(outcomes, dtype=float)
+        n = self.a.size
+        s = np.bincount(idx, weights=outcomes, minlength=n)
+        total = np.bincount(idx, minlength=n)
+        self.a += s.reshape(self.a.shape)
+        self.b += (total - s).reshape(self.b.shape)
+        return self
+
+    def mean(self):
+        """ Media posterior, $a / (a + b)$. """
+        return self.a / (self.a + self.b)
+
+    def var(self):
+        """ Varianza posterior, $ab / ((a+b)^2 (a+b+1))$. """
+        n = self.a + self.b
+        return self.a * self.b / (n * n * (n + 1))
+
+    def quantile(self, q):
+        """ Cuantil posterior de orden ``q`` de cada proporción.
+
+        :param q: Orden del cuantil (escalar o arreglo que broadcastee).
+        :return: Arreglo con los cuantiles.
+        """
+        return betaincinv(self.a, self.b, q)
+
+    def credible_interval(self, level=0.95):
+        """ Intervalo de probabilidad posterior de colas iguales.
+
+        :param level: Probabilidad del intervalo.
+        :return: Arreglo de forma ``a.shape + (2,)`` con extremos inferior y
+            superior.
+        """
+        alpha = (1 - level) / 2
+        q = np.array([alpha, 1 - alpha])
+        return betaincinv(self.a[..., None], self.b[..., None], q)
+
+    def prob_greater(self, threshold):
+        """ Probabilidad posterior $P(p > threshold | x)$.
+
+        Se usa $1 - I_t(a, b) = I_{1-t}(b, a)$ para no perder precisión en la
+        cola superior.
+
+        :param threshold: Umbral (escalar o arreglo que broadcastee).
+        :return: Arreglo con las probabilidades.
+        """
+        return betainc(self.b, self.a, 1 - np.asarray(threshold, dtype=float))
+
+    def summary(self, level=0.95):
+        """ Resúmenes posteriores en un diccionario de arreglos.
+
+        :param level: Probabilidad del intervalo de credibilidad.
+        :return: Diccionario con ``mean``, ``var``, ``lower`` y ``upper``.
+        """
+        ci = self.credible_interval(level)
+        return {"mean": self.mean(), "var": self.var(),
+                "lower": ci[..., 0], "upper": ci[..., 1]}
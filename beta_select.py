@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""Versión por lotes de ``beta_select`` (bayesiana_ejemplo1.py).
+
+Para cada especificación $(p_1, x_1, p_2, x_2)$ se buscan $a, b > 0$ tales que
+$I_{x_1}(a, b) = p_1$ e $I_{x_2}(a, b) = p_2$, con $I_x$ la función beta
+incompleta regularizada. En lugar de llamar ``fsolve`` una vez por
+especificación:
+
+1. Se parte de un valor inicial por momentos: una aproximación normal con los
+   dos cuantiles da una media y una varianza, y de ahí $a$ y $b$.
+2. Se hacen iteraciones de Newton sobre $(\\log a, \\log b)$ para todas las
+   especificaciones a la vez, con el jacobiano analítico de $I_x(a, b)$. Las
+   ecuaciones se resuelven en escala probit, $\\Phi^{-1}(I_x(a, b)) =
+   \\Phi^{-1}(p)$, que es casi lineal en $(\\log a, \\log b)$.
+3. Las especificaciones ya resueltas se guardan en una memoria LRU.
+
+Derivadas de la beta incompleta. Derivando bajo el signo de integral,
+
+$$
+\\frac{\\partial}{\\partial a} I_x(a, b) = \\frac{1}{B(a,b)} \\int_0^x t^{a-1}(1-t)^{b-1}\\log t\\,dt
+    - I_x(a, b)(\\psi(a) - \\psi(a+b))
+$$
+
+y análogamente para $b$ con $\\log(1-t)$ y $\\psi(b)$. Las integrales se evalúan
+con cuadratura de Gauss-Laguerre después del cambio de variable
+$t = x e^{-s/a}$, que absorbe el factor $t^{a-1}$ en el peso $e^{-s}$; para
+$x > 1/2$ se usa la simetría $I_x(a, b) = 1 - I_{1-x}(b, a)$.
+"""
+
+from collections import OrderedDict
+import warnings
+
+import numpy as np
+from scipy.special import betainc, betaln, digamma, ndtri
+
+_NODES, _WEIGHTS = np.polynomial.laguerre.laggauss(48)
+
+
+def _betainc_grad_lower(c, d, y):
+    """ Derivadas de $I_y(c, d)$ respecto a $c$ y $d$, para $y \\le 1/2$. """
+    c_, d_, y_ = c[:, None], d[:, None], y[:, None]
+    t = y_ * np.exp(-_NODES / c_)
+    kernel = _WEIGHTS * (1 - t) ** (d_ - 1)
+    const = np.exp(c * np.log(y) - np.log(c) - betaln(c, d))
+    cdf = betainc(c, d, y)
+    log_t = np.sum(kernel * (np.log(y_) - _NODES / c_), axis=1)
+    log_1mt = np.sum(kernel * np.log1p(-t), axis=1)
+    d_c = const * log_t - cdf * (digamma(c) - digamma(c + d))
+    d_d = const * log_1mt - cdf * (digamma(d) - digamma(c + d))
+    return d_c, d_d
+
+
+def _betainc_grad(a, b, x):
+    """ Gradiente de $I_x(a, b)$ respecto a $(a, b)$, vectorizado.
+
+    Para $x > 1/2$ se usa $I_x(a, b) = 1 - I_{1-x}(b, a)$, de modo que la
+    cuadratura siempre se hace en la mitad donde el integrando es suave.
+    """
+    d_a = np.empty_like(x)
+    d_b = np.empty_like(x)
+    low = x <= 0.5
+    d_a[low], d_b[low] = _betainc_grad_lower(a[low], b[low], x[low])
+    high = ~low
+    d_b_high, d_a_high = _betainc_grad_lower(b[high], a[high], 1 - x[high])
+    d_a[high], d_b[high] = -d_a_high, -d_b_high
+    return d_a, d_b
+
+
+def _initial_guess(p1, x1, p2, x2):
+    """ Valor inicial por momentos a partir de una aproximación normal. """
+    z1, z2 = ndtri(p1), ndtri(p2)
+    sd = (x2 - x1) / (z2 - z1)
+    mean = np.clip(x1 - z1 * sd, 0.01, 0.99)
+    var = np.minimum(sd ** 2, 0.9 * mean * (1 - mean))
+    nu = np.maximum(mean * (1 - mean) / var - 1, 0.5)
+    return mean * nu, (1 - mean) * nu
+
+
+def _residual(log_a, log_b, x, z):
+    """ Residual en escala probit: $\\Phi^{-1}(I_x(a, b)) - \\Phi^{-1}(p)$.
+
+    La cola superior se calcula como $I_{1-x}(b, a)$ para no perder precisión
+    cuando $I_x(a, b)$ es cercano a 1.
+    """
+    a, b = np.exp(log_a)[:, None], np.exp(log_b)[:, None]
+    cdf = betainc(a, b, x)
+    z_hat = np.where(cdf < 0.5, ndtri(cdf), -ndtri(betainc(b, a, 1 - x)))
+    return z_hat - z, cdf, z_hat
+
+
+def _newton(p1, x1, p2, x2, tol, maxiter):
+    a, b = _initial_guess(p1, x1, p2, x2)
+    log_a, log_b = np.log(a), np.log(b)
+    x = np.stack([x1, x2], axis=1)
+    p = np.stack([p1, p2], axis=1)
+    z = ndtri(p)
+    active = np.ones(p1.size, dtype=bool)
+    stalled = np.zeros(p1.size, dtype=bool)
+
+    for _ in range(maxiter):
+        idx = np.flatnonzero(active)
+        resid, cdf, z_hat = _residual(log_a[idx], log_b[idx], x[idx], z[idx])
+        done = np.max(np.abs(cdf - p[idx]), axis=1) < tol
+        active[idx[done]] = False
+        if not active.any():
+            break
+        rows, resid, z_hat = idx[~done], resid[~done], z_hat[~done]
+        a, b, xa = np.exp(log_a[rows]), np.exp(log_b[rows]), x[rows]
+
+        # Jacobiano del residual probit respecto a (log a, log b). La densidad
+        # se acota por abajo para que no se anule en las colas extremas.
+        dens = np.maximum(np.exp(-0.5 * z_hat ** 2) / np.sqrt(2 * np.pi),
+                          np.finfo(float).tiny)
+        jac = np.empty((rows.size, 2, 2))
+        # Las especificaciones sin solución pueden dar jacobianos con inf o
+        # nan; se detectan como singulares abajo.
+        with np.errstate(invalid="ignore", over="ignore", divide="ignore"):
+            for j in range(2):
+                d_a, d_b = _betainc_grad(a, b, xa[:, j])
+                jac[:, j, 0] = d_a * a / dens[:, j]
+                jac[:, j, 1] = d_b * b / dens[:, j]
+            # Solución explícita del sistema 2x2; un jacobiano singular deja
+            # el paso en cero y esa especificación queda sin converger.
+            j00, j01 = jac[:, 0, 0], jac[:, 0, 1]
+            j10, j11 = jac[:, 1, 0], jac[:, 1, 1]
+            det = j00 * j11 - j01 * j10
+            singular = ~(np.abs(det) > 0) | ~np.isfinite(det)
+            det = np.where(singular, 1.0, det)
+            step = np.stack([j11 * resid[:, 0] - j01 * resid[:, 1],
+                             j00 * resid[:, 1] - j10 * resid[:, 0]], axis=1)
+            step /= det[:, None]
+            step[singular] = 0
+        step = np.clip(np.nan_to_num(step), -1, 1)
+
+        # Búsqueda lineal: se reduce el paso a la mitad donde no mejora. Si
+        # tras 10 reducciones sigue sin mejorar, la especificación conserva
+        # su valor anterior y deja de iterar: queda sin converger.
+        norm = np.sum(resid ** 2, axis=1)
+        for _ in range(10):
+            new_a = log_a[rows] - step[:, 0]
+            new_b = log_b[rows] - step[:, 1]
+            new_resid, _, _ = _residual(new_a, new_b, xa, z[rows])
+            better = np.sum(new_resid ** 2, axis=1) < norm
+            if better.all():
+                break
+            step[~better] *= 0.5
+        log_a[rows[better]] = new_a[better]
+        log_b[rows[better]] = new_b[better]
+        stalled[rows[~better]] = True
+        active[rows[~better]] = False
+
+    a, b = np.exp(log_a), np.exp(log_b)
+    cdf = betainc(a[:, None], b[:, None], x)
+    return a, b, (np.max(np.abs(cdf - p), axis=1) < tol) & ~stalled
+
+
+class BetaSelector:
+    def __init__(self, maxsize=100_000, tol=1e-10, maxiter=50):
+        """ Resolvedor por lotes de ``beta_select`` con memoria LRU.
+
+        :param maxsize: Número máximo de especificaciones en memoria.
+        :param tol: Tolerancia en los cuantiles.
+        :param maxiter: Número máximo de iteraciones de Newton.
+        """
+        self.maxsize = maxsize
+        self.tol = tol
+        self.maxiter = maxiter
+        self._cache = OrderedDict()
+
+    def __call__(self, p1, x1, p2, x2, return_converged=False):
+        """ Resuelve un lote de especificaciones.
+
+        Las especificaciones en las que Newton no converge quedan con
+        ``nan`` (y se emite un ``RuntimeWarning``); las demás se regresan y
+        se guardan en la memoria de todos modos.
+
+        :param p1: Orden del primer cuantil (escalar o arreglo).
+        :param x1: Primer cuantil.
+        :param p2: Orden del segundo cuantil.
+        :param x2: Segundo cuantil.
+        :param return_converged: Si además se regresa la máscara de
+            convergencia.
+        :return: Arreglo (n, 2) con los parámetros $(a, b)$ de cada
+            especificación, o la tupla ``(params, converged)``.
+        """
+        specs = np.broadcast_arrays(*(np.atleast_1d(np.asarray(v, dtype=float))
+                                      for v in (p1, x1, p2, x2)))
+        p1, x1, p2, x2 = (v.ravel() for v in specs)
+        if np.any((x1 >= x2) | (p1 >= p2)):
+            raise ValueError("Se requiere x1 < x2 y p1 < p2.")
+
+        keys = list(zip(p1.tolist(), x1.tolist(), p2.tolist(), x2.tolist()))
+        out = np.empty((len(keys), 2))
+        converged = np.ones(len(keys), dtype=bool)
+        missing = []
+        for i, key in enumerate(keys):
+            params = self._cache.get(key)
+            if params is None:
+                missing.append(i)
+            else:
+                self._cache.move_to_end(key)
+                out[i] = params
+
+        if missing:
+            missing = np.array(missing)
+            a, b, ok = _newton(p1[missing], x1[missing], p2[missing],
+                               x2[missing], self.tol, self.maxiter)
+            if not ok.all():
+                warnings.warn(
+                    f"Newton no convergió en las especificaciones "
+                    f"{missing[~ok].tolist()}", RuntimeWarning)
+                a, b = np.where(ok, a, np.nan), np.where(ok, b, np.nan)
+                converged[missing[~ok]] = False
+            out[missing, 0] = a
+            out[missing, 1] = b
+            for i in missing[ok]:
+                self._cache[keys[i]] = (out[i, 0], out[i, 1])
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+
+        if return_converged:
+            return out, converged
+        return out
+
+    def cache_clear(self):
+        self._cache.clear()
+
+
+beta_select_batch = BetaSelector()
@@ -0,0 +1,637 @@
+# -*- coding: utf-8 -*-
+"""Modelos lineales dinámicos (DLM) gaussianos: filtro de Kalman, suavizador
+y pronósticos, en NumPy.
+
+Es la contraparte en Python de ``dlmFilter``, ``dlmSmooth`` y ``dlmForecast``
+del paquete ``dlm`` de R (KalmanFilter_DLM.Rmd y KalmanFilterSmooth_DLM.Rmd).
+El modelo es
+
+$$
+\\begin{align*}
+y_t &= F\\theta_t + v_t, & v_t &\\sim \\mathcal{N}(0, V) \\\\
+\\theta_t &= G\\theta_{t-1} + w_t, & w_t &\\sim \\mathcal{N}(0, W)
+\\end{align*}
+$$
+
+con $\\theta_0 \\sim \\mathcal{N}(m_0, C_0)$.
+
+- La covarianza filtrada se actualiza en forma de Joseph,
+  $C_t = (I - K_tF)R_t(I - K_tF)^T + K_tVK_t^T$, que conserva la simetría y la
+  positividad aun con $C_0$ difusa (p.ej. ``1e7``).
+- Varias series independientes de la misma dimensión se filtran a la vez: ``y``
+  puede tener forma (T,), (T, p) o (B, T, p). ``V``, ``W``, ``m0`` y ``C0``
+  pueden ser comunes o tener un eje inicial de tamaño B.
+- Los valores faltantes (``nan``) se tratan como en R: no hay actualización.
+- En modelos invariantes en el tiempo (p.ej. ``dlmModPoly``) el filtro puede
+  cambiar a una ganancia estacionaria, detectada durante el filtrado o
+  calculada con la ecuación de Riccati (``steady_state_gain``).
+
+Ejemplo (ballenas.csv)::
+
+    mod1 = dlm_mod_poly(2, dV=20, m0=[2300, 0])
+    mod1_filt = dlm_filter(ballenas, mod1)
+    mod1_fore = dlm_forecast(mod1_filt, n_ahead=5)
+    mod1_fore.a[:, 0]
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+FilterResult = namedtuple("FilterResult", "y mod m C a R f Q loglik")
+SmoothResult = namedtuple("SmoothResult", "s S")
+ForecastResult = namedtuple("ForecastResult", "a R f Q new_states new_obs")
+
+
+def _mT(x):
+    return np.swapaxes(x, -1, -2)
+
+
+def _symmetrize(x):
+    return 0.5 * (x + _mT(x))
+
+
+def _psd_factor(x):
+    """ Factor $A$ con $AA^T = x$, válido también para matrices semidefinidas
+    (p.ej. ``W = diag(c(0, 1))`` de ``dlmModPoly``).
+    """
+    lam, U = np.linalg.eigh(_symmetrize(x))
+    return U * np.sqrt(np.maximum(lam, 0.0))[..., None, :]
+
+
+class DLM:
+    def __init__(self, FF, GG, V, W, m0, C0):
+        """ Constructor del modelo, con la notación del paquete ``dlm``.
+
+        :param FF: Matriz de observación, (p, n).
+        :param GG: Matriz de evolución, (n, n).
+        :param V: Covarianza de observación, (p, p) o (B, p, p).
+        :param W: Covarianza de evolución, (n, n) o (B, n, n).
+        :param m0: Media inicial del estado, (n,) o (B, n).
+        :param C0: Covarianza inicial del estado, (n, n) o (B, n, n).
+        """
+        self.FF = np.atleast_2d(np.asarray(FF, dtype=float))
+        self.GG = np.atleast_2d(np.asarray(GG, dtype=float))
+        p, n = self.FF.shape
+        self.V = np.asarray(V, dtype=float).reshape(
+            np.shape(V)[:-2] + (p, p) if np.ndim(V) >= 2 else (p, p))
+        self.W = np.asarray(W, dtype=float).reshape(
+            np.shape(W)[:-2] + (n, n) if np.ndim(W) >= 2 else (n, n))
+        self.m0 = np.asarray(m0, dtype=float)
+        self.C0 = np.asarray(C0, dtype=float).reshape(
+            np.shape(C0)[:-2] + (n, n) if np.ndim(C0) >= 2 else (n, n))
+
+    @property
+    def obs_dim(self):
+        return self.FF.shape[0]
+
+    @property
+    def state_dim(self):
+        return self.FF.shape[1]
+
+
+def dlm_mod_poly(order=1, dV=1.0, dW=None, m0=None, C0=None):
+    """ Modelo polinomial de orden ``order``, como ``dlmModPoly`` de R.
+
+    :param order: Orden del polinomio (1: nivel local, 2: tendencia lineal).
+    :param dV: Varianza de observación.
+    :param dW: Diagonal de ``W``; por defecto ``c(0, ..., 0, 1)``.
+    :param m0: Media inicial; por defecto ceros.
+    :param C0: Covarianza inicial; por defecto ``1e7 * I``.
+    :return: Un ``DLM``.
+    """
+    if dW is None:
+        dW = np.r_[np.zeros(order - 1), 1.0]
+    if m0 is None:
+        m0 = np.zeros(order)
+    if C0 is None:
+        C0 = 1e7 * np.eye(order)
+    FF = np.r_[1.0, np.zeros(order - 1)][None, :]
+    GG = np.eye(order) + np.eye(order, k=1)
+    return DLM(FF, GG, [[dV]], np.diag(dW), m0, C0)
+
+
+def _as_batch(y, p):
+    """ Lleva ``y`` a forma (B, T, p); regresa también si había eje de lote. """
+    y = np.asarray(y, dtype=float)
+    if y.ndim == 1:
+        return y.reshape(1, -1, 1), False
+    if y.ndim == 2:
+        return (y[None] if p > 1 else y[:, :, None]), p == 1
+    return y, True
+
+
+def steady_state_gain(mod):
+    """ Ganancia de Kalman estacionaria de un DLM invariante en el tiempo.
+
+    La covarianza de predicción estacionaria $R$ resuelve la ecuación
+    algebraica discreta de Riccati
+
+    $$
+    R = G\\left(R - RF^T(FRF^T + V)^{-1}FR\\right)G^T + W,
+    $$
+
+    que se resuelve con ``scipy.linalg.solve_discrete_are``.
+
+    :param mod: Un ``DLM`` (si ``V`` o ``W`` tienen eje de lote se resuelve una
+        ecuación por serie).
+    :return: Tupla ``(K, R, C, Q)`` con la ganancia (B, n, p), la covarianza de
+        predicción (B, n, n), la filtrada (B, n, n) y la de pronóstico
+        (B, p, p).
+    """
+    from scipy.linalg import solve_discrete_are
+
+    F, G = mod.FF, mod.GG
+    p, n = F.shape
+    B = np.broadcast_shapes(mod.V.shape[:-2], mod.W.shape[:-2], (1,))[0]
+    V = np.broadcast_to(mod.V, (B, p, p))
+    W = np.broadcast_to(mod.W, (B, n, n))
+    R = np.stack([solve_discrete_are(G.T, F.T, W[b], V[b]) for b in range(B)])
+    R = _symmetrize(R)
+    Q = _symmetrize(F @ R @ F.T + V)
+    K = _mT(np.linalg.solve(Q, F @ R))
+    IKF = np.eye(n) - K @ F
+    C = _symmetrize(IKF @ R @ _mT(IKF) + K @ V @ _mT(K))
+    return K, R, C, Q
+
+
+def _constant_gain_filter(Y, F, G, K, R, C, Q, m, a, f, Rs, Cs, Qs, loglik,
+                          start):
+    """ Filtro con ganancia constante a partir del tiempo ``start``.
+
+    Cada paso son dos productos matriz-vector: $a_t = Gm_{t-1}$ y
+    $m_t = a_t + K(y_t - Fa_t)$; las covarianzas ya no cambian.
+    """
+    T = Y.shape[1]
+    p = F.shape[0]
+    L = np.linalg.cholesky(Q)
+    log_det = 2 * np.sum(np.log(np.diagonal(L, axis1=1, axis2=2)), axis=1)
+    Linv = np.linalg.solve(L, np.broadcast_to(np.eye(p), Q.shape))
+    Kt = _mT(K)
+    mt = m[:, start]
+    for t in range(start, T):
+        at = mt @ G.T
+        ft = at @ F.T
+        err = Y[:, t] - ft
+        mt = at + (err[:, None, :] @ Kt)[:, 0]
+        a[:, t], f[:, t], m[:, t + 1] = at, ft, mt
+
+    Rs[:, start:] = R[:, None]
+    Cs[:, start + 1:] = C[:, None]
+    Qs[:, start:] = Q[:, None]
+    err = Y[:, start:] - f[:, start:]
+    z = np.einsum("bij,btj->bti", Linv, err)
+    loglik -= 0.5 * np.sum(p * np.log(2 * np.pi) + log_det[:, None]
+                           + np.sum(z * z, axis=2), axis=1)
+
+
+def dlm_filter(y, mod, steady_state=None, tol=1e-9):
+    """ Filtro de Kalman, como ``dlmFilter``.
+
+    :param y: Serie(s) observadas, de forma (T,), (T, p) o (B, T, p). Con
+        $p = 1$ una matriz (B, T) se interpreta como B series.
+    :param mod: Un ``DLM``.
+    :param steady_state: Para modelos invariantes en el tiempo, la covarianza
+        filtrada converge a un punto fijo y desde ahí la ganancia es constante.
+
+        - ``None``: filtro completo en cada paso.
+        - ``"detect"``: filtro completo hasta que el cambio relativo de $C_t$
+          es menor que ``tol`` en todas las series; después, ganancia constante
+          (sin inversiones de matrices). Solo se cambia si ya no hay faltantes.
+        - ``"dare"``: ganancia de ``steady_state_gain`` desde $t = 1$, es decir,
+          se supone que $C_0$ ya es la covarianza estacionaria (se ignora
+          ``mod.C0``).
+    :param tol: Tolerancia para ``"detect"``.
+    :return: ``FilterResult`` con arreglos de forma (B, ...): ``m`` y ``C``
+        (T+1 filas, la primera es $m_0, C_0$), ``a`` y ``R`` (predicción del
+        estado), ``f`` y ``Q`` (pronóstico a un paso) y ``loglik`` (B,), la
+        log-verosimilitud del error de predicción. Si ``y`` no tenía eje de lote
+        se omite el eje B.
+    """
+    if steady_state not in (None, "detect", "dare"):
+        raise ValueError("steady_state debe ser None, 'detect' o 'dare'.")
+    F, G = mod.FF, mod.GG
+    p, n = F.shape
+    Y, batched = _as_batch(y, p)
+    B, T, _ = Y.shape
+    missing = np.isnan(Y).any(axis=2)
+
+    m = np.empty((B, T + 1, n))
+    C = np.empty((B, T + 1, n, n))
+    a = np.empty((B, T, n))
+    R = np.empty((B, T, n, n))
+    f = np.empty((B, T, p))
+    Q = np.empty((B, T, p, p))
+    loglik = np.zeros(B)
+    m[:, 0] = mod.m0
+    C[:, 0] = mod.C0
+    V = np.broadcast_to(mod.V, (B, p, p))
+    W = np.broadcast_to(mod.W, (B, n, n))
+    eye = np.eye(n)
+
+    if steady_state == "dare":
+        if missing.any():
+            raise ValueError("steady_state='dare' no admite faltantes.")
+        K_ss, R_ss, C_ss, Q_ss = (np.broadcast_to(v, (B,) + v.shape[1:])
+                                  for v in steady_state_gain(mod))
+        C[:, 0] = C_ss
+        _constant_gain_filter(Y, F, G, K_ss, R_ss, C_ss, Q_ss, m, a, f, R, C,
+                              Q, loglik, 0)
+        T = 0
+
+    pending_missing = np.cumsum(missing[:, ::-1].any(axis=0))[::-1]
+    for t in range(T):
+        a[:, t] = m[:, t] @ G.T
+        R[:, t] = _symmetrize(G @ C[:, t] @ G.T + W)
+        f[:, t] = a[:, t] @ F.T
+        RFt = R[:, t] @ F.T
+        Q[:, t] = _symmetrize(F @ RFt + V)
+
+        obs = ~missing[:, t]
+        err = np.where(obs[:, None], Y[:, t] - f[:, t], 0.0)
+        L = np.linalg.cholesky(Q[:, t])
+        K = _mT(np.linalg.solve(_mT(L), np.linalg.solve(L, _mT(RFt))))
+        K[~obs] = 0.0
+
+        m[:, t + 1] = a[:, t] + (K @ err[:, :, None])[:, :, 0]
+        IKF = eye - K @ F
+        C[:, t + 1] = _symmetrize(IKF @ R[:, t] @ _mT(IKF) + K @ V @ _mT(K))
+
+        z = np.linalg.solve(L, err[:, :, None])[:, :, 0]
+        log_det = 2 * np.sum(np.log(np.diagonal(L, axis1=1, axis2=2)), axis=1)
+        loglik -= np.where(obs, 0.5 * (p * np.log(2 * np.pi) + log_det
+                                       + np.sum(z * z, axis=1)), 0.0)
+
+        if (steady_state == "detect" and t + 1 < T
+                and pending_missing[t + 1] == 0):
+            change = (np.abs(C[:, t + 1] - C[:, t]).max(axis=(1, 2))
+                      / np.abs(C[:, t + 1]).max(axis=(1, 2)))
+            if np.all(change < tol):
+                _constant_gain_filter(Y, F, G, K, R[:, t], C[:, t + 1],
+                                      Q[:, t], m, a, f, R, C, Q, loglik, t + 1)
+                break
+
+    res = FilterResult(Y, mod, m, C, a, R, f, Q, loglik)
+    if not batched:
+        res = FilterResult(*(v[0] if isinstance(v, np.ndarray) else v
+                             for v in res))
+    return res
+
+
+def _batched_filter(filt):
+    if filt.loglik.ndim == 0:
+        return FilterResult(*(v[None] if isinstance(v, np.ndarray) else v
+                              for v in filt)), False
+    return filt, True
+
+
+def dlm_smooth(filt):
+    """ Suavizador de Rauch-Tung-Striebel, como ``dlmSmooth``.
+
+    :param filt: Resultado de ``dlm_filter``.
+    :return: ``SmoothResult`` con ``s`` (T+1, n) y ``S`` (T+1, n, n), con eje
+        de lote si el filtro lo tenía.
+    """
+    filt, batched = _batched_filter(filt)
+    G = filt.mod.GG
+    T = filt.a.shape[1]
+    s = np.empty_like(filt.m)
+    S = np.empty_like(filt.C)
+    s[:, T] = filt.m[:, T]
+    S[:, T] = filt.C[:, T]
+
+    for t in range(T - 1, -1, -1):
+        # J = C_t G^T R_{t+1}^{-1}
+        J = _mT(np.linalg.solve(filt.R[:, t], G @ filt.C[:, t]))
+        diff = s[:, t + 1] - filt.a[:, t]
+        s[:, t] = filt.m[:, t] + (J @ diff[:, :, None])[:, :, 0]
+        S[:, t] = _symmetrize(
+            filt.C[:, t] + J @ (S[:, t + 1] - filt.R[:, t]) @ _mT(J))
+
+    if not batched:
+        return SmoothResult(s[0], S[0])
+    return SmoothResult(s, S)
+
+
+def dlm_forecast(filt, n_ahead=1, sample_new=0, rng=None):
+    """ Pronósticos de estados y observaciones, como ``dlmForecast``.
+
+    :param filt: Resultado de ``dlm_filter``.
+    :param n_ahead: Número de pasos hacia adelante.
+    :param sample_new: Número de trayectorias simuladas (``sampleNew`` en R).
+    :param rng: Generador de NumPy para las simulaciones.
+    :return: ``ForecastResult`` con ``a`` (n_ahead, n), ``R``, ``f``
+        (n_ahead, p) y ``Q``; si ``sample_new > 0`` también ``new_states``
+        (sample_new, n_ahead, n) y ``new_obs`` (sample_new, n_ahead, p). Con eje
+        de lote si el filtro lo tenía (después del eje de simulaciones).
+    """
+    filt, batched = _batched_filter(filt)
+    mod = filt.mod
+    F, G = mod.FF, mod.GG
+    p, n = F.shape
+    B = filt.m.shape[0]
+    V = np.broadcast_to(mod.V, (B, p, p))
+    W = np.broadcast_to(mod.W, (B, n, n))
+
+    a = np.empty((B, n_ahead, n))
+    R = np.empty((B, n_ahead, n, n))
+    mk, Ck = filt.m[:, -1], filt.C[:, -1]
+    for k in range(n_ahead):
+        mk = mk @ G.T
+        Ck = _symmetrize(G @ Ck @ G.T + W)
+        a[:, k], R[:, k] = mk, Ck
+    f = a @ F.T
+    Q = _symmetrize(F @ R @ F.T + V[:, None])
+
+    new_states = new_obs = None
+    if sample_new:
+        rng = np.random.default_rng() if rng is None else rng
+        chol_C = _psd_factor(filt.C[:, -1])
+        chol_W = _psd_factor(W)
+        chol_V = _psd_factor(V)
+        theta = filt.m[:, -1] + np.einsum(
+            "bij,sbj->sbi", chol_C, rng.standard_normal((sample_new, B, n)))
+        new_states = np.empty((sample_new, B, n_ahead, n))
+        new_obs = np.empty((sample_new, B, n_ahead, p))
+        for k in range(n_ahead):
+            w = np.einsum("bij,sbj->sbi", chol_W,
+                          rng.standard_normal((sample_new, B, n)))
+            theta = theta @ G.T + w
+            v = np.einsum("bij,sbj->sbi", chol_V,
+                          rng.standard_normal((sample_new, B, p)))
+            new_states[:, :, k] = theta
+            new_obs[:, :, k] = theta @ F.T + v
+
+    if not batched:
+        if sample_new:
+            new_states, new_obs = new_states[:, 0], new_obs[:, 0]
+        return ForecastResult(a[0], R[0], f[0], Q[0], new_states, new_obs)
+    return ForecastResult(a, R, f, Q, new_states, new_obs)
+
+
+def dlm_bsample(filt, n_draws=1, rng=None):
+    """ Muestreo hacia atrás (FFBS), como ``dlmBSample``.
+
+    Con los momentos filtrados ya guardados se simula
+    $\\theta_T \\sim \\mathcal{N}(m_T, C_T)$ y, para $t = T-1, \\ldots, 0$,
+
+    $$
+    \\theta_t | \\theta_{t+1} \\sim \\mathcal{N}(m_t + J_t(\\theta_{t+1} - a_{t+1}),
+        C_t - J_tR_{t+1}J_t^T), \\quad J_t = C_tG^TR_{t+1}^{-1}.
+    $$
+
+    $J_t$ y el factor de la covarianza no dependen de la trayectoria, así que se
+    calculan una sola vez por tiempo y sirven para todas las simulaciones.
+
+    :param filt: Resultado de ``dlm_filter``.
+    :param n_draws: Número de trayectorias.
+    :param rng: Generador de NumPy.
+    :return: Arreglo (n_draws, T+1, n), o (n_draws, B, T+1, n) si el filtro
+        tenía eje de lote.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    filt, batched = _batched_filter(filt)
+    G = filt.mod.GG
+    B, T1, n = filt.m.shape
+    T = T1 - 1
+    theta = np.empty((n_draws, B, T1, n))
+
+    def draw(mean, factor):
+        eps = rng.standard_normal((n_draws, B, n))
+        return mean + np.einsum("bij,sbj->sbi", factor, eps)
+
+    theta[:, :, T] = draw(filt.m[:, T], _psd_factor(filt.C[:, T]))
+    for t in range(T - 1, -1, -1):
+        J = _mT(np.linalg.solve(filt.R[:, t], G @ filt.C[:, t]))
+        H = filt.C[:, t] - J @ filt.R[:, t] @ _mT(J)
+        h = filt.m[:, t] + np.einsum("bij,sbj->sbi", J,
+                                     theta[:, :, t + 1] - filt.a[:, t])
+        theta[:, :, t] = draw(h, _psd_factor(H))
+
+    return theta if batched else theta[:, 0]
+
+
+def dlm_gibbs_dig(y, mod, n_iter, a_y, b_y, a_theta, b_theta, burn=0,
+                  save_states=False, rng=None):
+    """ Muestreador de Gibbs para $V$ y $W$ desconocidas (d-inverse-gamma),
+    como ``dlmGibbsDIG``.
+
+    Para una serie univariada con $W$ diagonal y iniciales
+    $1/V \\sim \\text{Gamma}(a_y, b_y)$, $1/W_{ii} \\sim \\text{Gamma}(a_\\theta,
+    b_\\theta)$ (forma y tasa), cada iteración:
+
+    1. Filtra con los valores actuales de $V$ y $W$ y simula una trayectoria
+       de estados con ``dlm_bsample``.
+    2. Simula $1/V \\sim \\text{Gamma}(a_y + T/2, b_y + \\frac{1}{2}\\sum_t
+       (y_t - F\\theta_t)^2)$.
+    3. Simula $1/W_{ii} \\sim \\text{Gamma}(a_\\theta + T/2, b_\\theta +
+       \\frac{1}{2}\\sum_t (\\theta_t - G\\theta_{t-1})_i^2)$.
+
+    :param y: Serie observada (T,); se permiten faltantes.
+    :param mod: ``DLM`` con $p = 1$; sus ``V`` y ``W`` son los valores
+        iniciales.
+    :param n_iter: Número de iteraciones guardadas.
+    :param a_y: Forma de la inicial de $1/V$.
+    :param b_y: Tasa de la inicial de $1/V$.
+    :param a_theta: Forma de la inicial de cada $1/W_{ii}$ (escalar o (n,)).
+    :param b_theta: Tasa de la inicial de cada $1/W_{ii}$ (escalar o (n,)).
+    :param burn: Iteraciones de calentamiento que se descartan.
+    :param save_states: Si es ``True`` también se guardan las trayectorias.
+    :param rng: Generador de NumPy.
+    :return: Diccionario con ``V`` (n_iter,), ``W`` (n_iter, n) y, si se pide,
+        ``theta`` (n_iter, T+1, n).
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    y = np.asarray(y, dtype=float).ravel()
+    F, G = mod.FF, mod.GG
+    n = F.shape[1]
+    obs = ~np.isnan(y)
+    T_obs, T = obs.sum(), y.size
+    V = float(np.asarray(mod.V).ravel()[0])
+    W_diag = np.diag(mod.W).copy()
+
+    out = {"V": np.empty(n_iter), "W": np.empty((n_iter, n))}
+    if save_states:
+        out["theta"] = np.empty((n_iter, T + 1, n))
+
+    for it in range(burn + n_iter):
+        cur = DLM(F, G, V, np.diag(W_diag), mod.m0, mod.C0)
+        theta = dlm_bsample(dlm_filter(y, cur), 1, rng)[0]
+
+        resid = y[obs] - (theta[1:] @ F.T)[obs, 0]
+        V = 1 / rng.gamma(a_y + 0.5 * T_obs,
+                          1 / (b_y + 0.5 * np.sum(resid ** 2)))
+        evol = theta[1:] - theta[:-1] @ G.T
+        W_diag = 1 / rng.gamma(a_theta + 0.5 * T,
+                               1 / (b_theta + 0.5 * np.sum(evol ** 2, axis=0)))
+
+        if it >= burn:
+            out["V"][it - burn] = V
+            out["W"][it - burn] = W_diag
+            if save_states:
+                out["theta"][it - burn] = theta
+
+    return out
+
+
+def dlm_loglik_grad(y, mod, free_W=None):
+    """ Log-verosimilitud del error de predicción y su gradiente respecto a los
+    logaritmos de las varianzas, en la misma pasada del filtro.
+
+    Se parametriza $V = \\text{diag}(e^{\\psi_V})$ y
+    $W = \\text{diag}(e^{\\psi_W})$ (solo las entradas libres de $W$) y se
+    derivan las recursiones del filtro (modo tangente): junto con $m_t, C_t$ se
+    propagan $\\partial m_t/\\partial\\psi_j$ y $\\partial C_t/\\partial\\psi_j$, y
+
+    $$
+    \\frac{\\partial \\ell_t}{\\partial \\psi_j} = -\\frac{1}{2}\\left(
+        \\text{tr}(Q_t^{-1}\\dot Q_t) + 2e_t^TQ_t^{-1}\\dot e_t
+        - e_t^TQ_t^{-1}\\dot Q_tQ_t^{-1}e_t\\right).
+    $$
+
+    :param y: Serie(s), como en ``dlm_filter``.
+    :param mod: ``DLM`` con ``V`` y ``W`` diagonales (comunes o por serie).
+    :param free_W: Máscara booleana (n,) de las entradas de ``diag(W)`` que se
+        estiman; por defecto las que no son cero.
+    :return: Tupla ``(loglik, grad)`` de formas (B,) y (B, p + k), con $k$ el
+        número de entradas libres de $W$; sin eje B si ``y`` no lo tenía.
+    """
+    F, G = mod.FF, mod.GG
+    p, n = F.shape
+    Y, batched = _as_batch(y, p)
+    B, T, _ = Y.shape
+    V = np.array(np.broadcast_to(mod.V, (B, p, p)))
+    W = np.array(np.broadcast_to(mod.W, (B, n, n)))
+    if free_W is None:
+        free_W = np.any(np.diagonal(W, axis1=1, axis2=2) != 0, axis=0)
+    free_idx = np.flatnonzero(free_W)
+    J = p + free_idx.size
+
+    # Derivadas de V y W respecto a cada log-varianza.
+    dV = np.zeros((B, J, p, p))
+    dW = np.zeros((B, J, n, n))
+    for j in range(p):
+        dV[:, j, j, j] = V[:, j, j]
+    for j, i in enumerate(free_idx):
+        dW[:, p + j, i, i] = W[:, i, i]
+
+    m = np.broadcast_to(mod.m0, (B, n)).astype(float)
+    C = np.broadcast_to(mod.C0, (B, n, n)).astype(float)
+    dm = np.zeros((B, J, n))
+    dC = np.zeros((B, J, n, n))
+    loglik = np.zeros(B)
+    grad = np.zeros((B, J))
+    eye = np.eye(n)
+    Gt, Ft = G.T, F.T
+
+    for t in range(T):
+        a = m @ Gt
+        da = dm @ Gt
+        R = _symmetrize(G @ C @ Gt + W)
+        dR = G @ dC @ Gt + dW
+        Q = _symmetrize(F @ R @ Ft + V)
+        dQ = F @ dR @ Ft + dV
+        Qinv = np.linalg.inv(Q)
+
+        obs = ~np.isnan(Y[:, t]).any(axis=1)
+        e = np.where(obs[:, None], Y[:, t] - a @ Ft, 0.0)
+        de = -(da @ Ft) * obs[:, None, None]
+        K = R @ Ft @ Qinv * obs[:, None, None]
+        dK = ((dR @ Ft - K[:, None] @ dQ) @ Qinv[:, None]
+              * obs[:, None, None, None])
+
+        m = a + (K @ e[:, :, None])[:, :, 0]
+        dm = (da + (dK @ e[:, None, :, None])[..., 0]
+              + (K[:, None] @ de[..., None])[..., 0])
+        IKF = eye - K @ F
+        C = _symmetrize(IKF @ R @ _mT(IKF) + K @ V @ _mT(K))
+        KQ = K @ Q
+        dC = (dR - dK @ _mT(KQ)[:, None] - K[:, None] @ dQ @ _mT(K)[:, None]
+              - KQ[:, None] @ _mT(dK))
+
+        u = (Qinv @ e[:, :, None])[:, :, 0]
+        _, log_det = np.linalg.slogdet(Q)
+        loglik -= obs * 0.5 * (p * np.log(2 * np.pi) + log_det
+                               + np.sum(u * e, axis=1))
+        tr = np.einsum("bij,bkji->bk", Qinv, dQ)
+        quad = np.einsum("bi,bkij,bj->bk", u, dQ, u)
+        grad -= obs[:, None] * 0.5 * (tr + 2 * np.einsum("bi,bki->bk", u, de)
+                                      - quad)
+
+    if not batched:
+        return loglik[0], grad[0]
+    return loglik, grad
+
+
+def _with_log_variances(mod, psi, free_idx):
+    p = mod.obs_dim
+    W = np.diag(np.diag(mod.W)).astype(float)
+    W[free_idx, free_idx] = np.exp(psi[p:])
+    return DLM(mod.FF, mod.GG, np.diag(np.exp(psi[:p])), W, mod.m0, mod.C0)
+
+
+def dlm_mle(y, mod, free_W=None, prior=None, **kwargs):
+    """ Estimación por máxima verosimilitud (o MAP) de $V$ y $W$ diagonales,
+    como ``dlmMLE``, con el gradiente analítico de ``dlm_loglik_grad``.
+
+    :param y: Serie observada (T,) o (T, p).
+    :param mod: ``DLM``; sus ``V`` y ``W`` son el punto inicial (las entradas
+        de ``W`` que no son libres se mantienen fijas).
+    :param free_W: Máscara de las entradas libres de ``diag(W)``.
+    :param prior: Tupla ``(a, b)`` para usar iniciales gamma-inversa
+        $\\sigma^2 \\sim \\text{GI}(a, b)$ en cada varianza (estimación MAP).
+    :param kwargs: Opciones para ``scipy.optimize.minimize`` (L-BFGS-B).
+    :return: Diccionario con ``V``, ``W``, ``loglik``, ``converged`` y
+        ``message``.
+    """
+    from scipy.optimize import minimize
+
+    W0 = np.diag(mod.W)
+    if free_W is None:
+        free_W = W0 != 0
+    free_idx = np.flatnonzero(free_W)
+    psi0 = np.log(np.r_[np.diag(mod.V), W0[free_idx]])
+
+    def objective(psi):
+        ll, g = dlm_loglik_grad(y, _with_log_variances(mod, psi, free_idx),
+                                free_W)
+        if prior is not None:
+            # log p(psi) = -a psi - b e^{-psi}, con el jacobiano de psi = log s2.
+            a, b = prior
+            ll = ll + np.sum(-a * psi - b * np.exp(-psi))
+            g = g + (-a + b * np.exp(-psi))
+        return -ll, -g
+
+    res = minimize(objective, psi0, jac=True, method="L-BFGS-B", **kwargs)
+    fitted = _with_log_variances(mod, res.x, free_idx)
+    return {"V": fitted.V, "W": fitted.W, "loglik": -res.fun,
+            "converged": res.success, "message": res.message}
+
+
+def _mle_worker(args):
+    Y, mod, free_W, prior, kwargs = args
+    return [dlm_mle(y, mod, free_W, prior, **kwargs) for y in Y]
+
+
+def dlm_mle_batch(Y, mod, free_W=None, prior=None, n_jobs=None,
+                  chunk_size=64, **kwargs):
+    """ Ajusta ``dlm_mle`` a muchas series en procesos paralelos.
+
+    :param Y: Arreglo (B, T) o (B, T, p) de series.
+    :param mod: ``DLM`` común (punto inicial y matrices $F$, $G$).
+    :param n_jobs: Número de procesos; ``None`` usa ``os.cpu_count()`` y ``1``
+        ajusta en el proceso actual.
+    :param chunk_size: Series por tarea.
+    :return: Lista de diccionarios de ``dlm_mle``, uno por serie.
+    """
+    Y = np.asarray(Y, dtype=float)
+    tasks = [(Y[i:i + chunk_size], mod, free_W, prior, kwargs)
+             for i in range(0, Y.shape[0], chunk_size)]
+    if n_jobs == 1:
+        chunks = map(_mle_worker, tasks)
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            chunks = list(pool.map(_mle_worker, tasks))
+    return [fit for chunk in chunks for fit in chunk]
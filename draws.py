@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""Almacén compacto de simulaciones posteriores.
+
+Los muestreadores del repositorio regresan listas de Python (``chain`` de
+``Metropolis.run``, ``obj_sample`` de ``rejection_sampling``) o el
+diccionario ``sample`` de ``g_prior_sample`` (baye_s10.py). ``PosteriorDraws``
+guarda todo en un solo arreglo contiguo de forma (cadenas, simulaciones,
+parámetros): 8 bytes por valor (4 con ``float32``) en lugar de los ~32 de un
+``float`` dentro de una lista, y opcionalmente como ``np.memmap``.
+
+- Los parámetros tienen nombre: ``draws["sigma2"]`` es una vista
+  (cadenas, simulaciones) y ``draws.select(chains=..., params=...)`` otro
+  ``PosteriorDraws`` que comparte memoria.
+- ``mean``, ``std``, ``quantiles`` y ``ess`` se calculan la primera vez que
+  se piden y se guardan. El ESS es la suma sobre cadenas de
+  ``hmc.effective_sample_size``.
+- ``save`` escribe un directorio con ``meta.json`` y ``values.npy`` por
+  bloques de simulaciones; ``load`` lo abre con ``mmap_mode="r"``.
+"""
+
+import json
+import os
+
+import numpy as np
+
+from hmc import effective_sample_size
+
+
+class PosteriorDraws:
+    def __init__(self, values, names=None, dtype=None):
+        """ Constructor.
+
+        :param values: Arreglo (cadenas, simulaciones, parámetros); también se
+            acepta (simulaciones,) o (simulaciones, parámetros) para una sola
+            cadena. No se copia si ya tiene el tipo pedido.
+        :param names: Nombres de los parámetros (por defecto ``theta[j]``).
+        :param dtype: Tipo de punto flotante (p. ej. ``np.float32``); por
+            defecto el de ``values`` o ``float64``.
+        """
+        values = np.asanyarray(values)
+        if dtype is None and not np.issubdtype(values.dtype, np.floating):
+            dtype = np.float64
+        if dtype is not None:
+            values = values.astype(dtype, copy=False)
+        if values.ndim == 1:
+            values = values[None, :, None]
+        elif values.ndim == 2:
+            values = values[None]
+        elif values.ndim != 3:
+            raise ValueError("values debe tener forma (cadenas, simulaciones, "
+                             f"parámetros), no {values.shape}")
+        if names is None:
+            names = [f"theta[{j}]" for j in range(values.shape[2])]
+        names = list(names)
+        if len(names) != values.shape[2]:
+            raise ValueError(f"se dieron {len(names)} nombres para "
+                             f"{values.shape[2]} parámetros")
+        self.values = values
+        self.names = names
+        self._index = {name: j for j, name in enumerate(names)}
+        self._cache = {}
+
+    @classmethod
+    def from_chains(cls, chains, names=None, dtype=None):
+        """ A partir de varias cadenas de la misma longitud, cada una una
+        lista de estados escalares o vectoriales (p. ej. ``Metropolis.run``).
+        """
+        values = np.stack([np.asarray(c, dtype=dtype) for c in chains])
+        if values.ndim == 2:
+            values = values[:, :, None]
+        return cls(values, names, dtype)
+
+    @classmethod
+    def from_dict(cls, sample, dtype=None):
+        """ A partir de un diccionario nombre -> simulaciones (S,) o (S, p),
+        como el de ``g_prior_sample``; las columnas de ``beta`` se llaman
+        ``beta[0]``, ``beta[1]``, etc.
+        """
+        columns, names = [], []
+        for name, values in sample.items():
+            values = np.asarray(values, dtype=dtype)
+            if values.ndim == 1:
+                columns.append(values[:, None])
+                names.append(name)
+            else:
+                values = values.reshape(values.shape[0], -1)
+                columns.append(values)
+                names.extend(f"{name}[{j}]" for j in range(values.shape[1]))
+        return cls(np.hstack(columns), names, dtype)
+
+    @property
+    def num_chains(self):
+        return self.values.shape[0]
+
+    @property
+    def num_draws(self):
+        return self.values.shape[1]
+
+    def __getitem__(self, name):
+        """ Vista (cadenas, simulaciones) del parámetro ``name``. """
+        return self.values[:, :, self._index[name]]
+
+    def chain(self, i):
+        """ Vista (simulaciones, parámetros) de la cadena ``i``. """
+        return self.values[i]
+
+    def select(self, chains=None, params=None):
+        """ Subconjunto de cadenas y parámetros (vistas cuando se usan
+        rebanadas).
+
+        :param chains: Entero, rebanada o lista de índices de cadenas.
+        :param params: Lista de nombres de parámetros.
+        """
+        values = self.values
+        if chains is not None:
+            if isinstance(chains, int):
+                chains = slice(chains, chains + 1)
+            values = values[chains]
+        names = self.names
+        if params is not None:
+            idx = [self._index[name] for name in params]
+            values = values[:, :, idx]
+            names = list(params)
+        return PosteriorDraws(values, names)
+
+    def _flat(self):
+        """ Simulaciones de todas las cadenas juntas, (cadenas*sim, parám). """
+        return self.values.reshape(-1, self.values.shape[2])
+
+    def _cached(self, key, compute):
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    @property
+    def mean(self):
+        """ Media posterior por parámetro, (parámetros,). """
+        return self._cached("mean", lambda: self._flat().mean(axis=0,
+                                                              dtype=np.float64))
+
+    @property
+    def std(self):
+        """ Desviación estándar posterior por parámetro. """
+        return self._cached("std", lambda: self._flat().std(axis=0,
+                                                            dtype=np.float64))
+
+    def quantiles(self, q=(0.025, 0.5, 0.975)):
+        """ Cuantiles por parámetro, de forma (len(q), parámetros). """
+        q = tuple(np.atleast_1d(q).tolist())
+        return self._cached(("quantiles", q), lambda: np.quantile(
+            self._flat(), q, axis=0))
+
+    @property
+    def ess(self):
+        """ Tamaño efectivo de muestra por parámetro (suma sobre cadenas). """
+        return self._cached("ess", lambda: sum(
+            effective_sample_size(self.values[c])
+            for c in range(self.num_chains)))
+
+    def summary(self):
+        """ Diccionario nombre -> ``{mean, std, q2.5, q50, q97.5, ess}``. """
+        q = self.quantiles()
+        return {name: {"mean": self.mean[j], "std": self.std[j],
+                       "q2.5": q[0, j], "q50": q[1, j], "q97.5": q[2, j],
+                       "ess": self.ess[j]}
+                for j, name in enumerate(self.names)}
+
+    def save(self, path, chunk_draws=65536):
+        """ Guarda en el directorio ``path`` (``meta.json`` y
+        ``values.npy``), copiando ``chunk_draws`` simulaciones a la vez para
+        no duplicar en memoria un arreglo mapeado.
+
+        Los archivos se escriben con un nombre temporal y se renombran al
+        final, así que se puede guardar sobre el mismo directorio del que se
+        cargaron los valores con ``load``.
+        """
+        os.makedirs(path, exist_ok=True)
+        values_path = os.path.join(path, "values.npy")
+        tmp = values_path + ".tmp"
+        out = np.lib.format.open_memmap(tmp, mode="w+",
+                                        dtype=self.values.dtype,
+                                        shape=self.values.shape)
+        for start in range(0, self.num_draws, chunk_draws):
+            out[:, start:start + chunk_draws] = \
+                self.values[:, start:start + chunk_draws]
+        out.flush()
+        del out
+        os.replace(tmp, values_path)
+        tmp = os.path.join(path, "meta.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump({"names": self.names}, f)
+        os.replace(tmp, os.path.join(path, "meta.json"))
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """ Abre un directorio escrito por ``save``.
+
+        :param mmap: Si los valores se mapean de disco (solo lectura) en
+            lugar de leerse a memoria.
+        """
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        values = np.load(os.path.join(path, "values.npy"),
+                         mmap_mode="r" if mmap else None)
+        return cls(values, meta["names"])
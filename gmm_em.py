@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+"""Algoritmo EM vectorizado para mezclas de normales multivariadas.
+
+Es el EM de tutorial_gmm.ipynb, pero en lugar de un objeto
+``multivariate_normal`` por componente:
+
+- Las $n \\times K$ log-densidades se calculan en una sola pasada a partir de los
+  factores de Cholesky $\\Sigma_k = L_k L_k^T$: con $P_k = L_k^{-1}$,
+  $$
+  \\log \\mathcal{N}(x | \\mu_k, \\Sigma_k) = -\\frac{1}{2}\\left(D\\log 2\\pi
+      + 2\\sum_d \\log (L_k)_{dd} + \\lVert P_k x - P_k \\mu_k \\rVert^2\\right).
+  $$
+- Las responsabilidades se normalizan con log-sum-exp.
+- El paso M usa los momentos ponderados $N_k = \\sum_n r_{nk}$,
+  $S_k = \\sum_n r_{nk} x_n$ y $Q_k = \\sum_n r_{nk} x_n x_n^T$, calculados con
+  ``einsum``.
+
+Los datos se recorren por bloques de ``chunk_size`` renglones y solo se
+acumulan $N_k, S_k, Q_k$, de modo que nunca se guarda la matriz completa de
+responsabilidades; la memoria es $O(\\text{chunk\\_size} \\cdot K D)$.
+
+``OnlineGaussianMixtureEM`` es la versión por pasos (stepwise EM, Cappé y
+Moulines 2009): consume mini-lotes de un generador o de un arreglo mapeado en
+memoria y actualiza los momentos normalizados
+$\\bar{s} \\leftarrow (1 - \\eta_t)\\bar{s} + \\eta_t s_{\\text{lote}}$ con
+$\\eta_t = (t + t_0)^{-\\kappa}$, $\\kappa \\in (1/2, 1]$, sin volver a leer
+datos anteriores.
+
+Los datos van en renglones: ``X`` tiene forma (n, D) (el notebook usa (D, n)).
+"""
+
+import numpy as np
+from scipy.special import logsumexp
+
+
+def precision_cholesky(covs):
+    """ Inversas de los factores de Cholesky y log-determinantes.
+
+    :param covs: Arreglo (K, D, D) de matrices de covarianza.
+    :return: Tupla ``(P, log_det)`` con ``P`` de forma (K, D, D), $P_k = L_k^{-1}$,
+        y ``log_det`` de forma (K,), $\\log|\\Sigma_k|$.
+    """
+    L = np.linalg.cholesky(covs)
+    eye = np.broadcast_to(np.eye(covs.shape[-1]), covs.shape)
+    P = np.linalg.solve(L, eye)
+    log_det = 2 * np.sum(np.log(np.diagonal(L, axis1=1, axis2=2)), axis=1)
+    return P, log_det
+
+
+def log_gaussian_densities(X, means, P, log_det):
+    """ Log-densidades normales de cada punto bajo cada componente.
+
+    :param X: Arreglo (n, D) de datos.
+    :param means: Arreglo (K, D) de medias.
+    :param P: Arreglo (K, D, D) con las inversas de los factores de Cholesky.
+    :param log_det: Arreglo (K,) con los log-determinantes.
+    :return: Arreglo (n, K).
+    """
+    D = X.shape[1]
+    y = (np.einsum("nd,ked->nke", X, P, optimize=True)
+         - np.einsum("kd,ked->ke", means, P))
+    maha = np.einsum("nke,nke->nk", y, y)
+    return -0.5 * (D * np.log(2 * np.pi) + log_det + maha)
+
+
+def log_responsibilities(X, weights, means, P, log_det):
+    """ Log-responsabilidades y log-verosimilitud de cada punto.
+
+    :return: Tupla ``(log_resp, log_like)`` de formas (n, K) y (n,).
+    """
+    log_joint = np.log(weights) + log_gaussian_densities(X, means, P, log_det)
+    log_like = logsumexp(log_joint, axis=1)
+    return log_joint - log_like[:, None], log_like
+
+
+def weighted_moments(X, resp):
+    """ Momentos ponderados $(N_k, S_k, Q_k)$ de un bloque de datos.
+
+    :param X: Arreglo (n, D).
+    :param resp: Arreglo (n, K) de responsabilidades.
+    :return: Tupla de arreglos de formas (K,), (K, D) y (K, D, D).
+    """
+    Nk = resp.sum(axis=0)
+    Sk = resp.T @ X
+    Qk = np.einsum("nkd,ne->kde", resp[:, :, None] * X[:, None, :], X,
+                   optimize=True)
+    return Nk, Sk, Qk
+
+
+def moments_to_params(Nk, Sk, Qk, reg_covar=1e-6):
+    """ Paso M: pesos, medias y covarianzas a partir de los momentos.
+
+    :param reg_covar: Valor que se suma a la diagonal de cada covarianza.
+    :return: Tupla ``(weights, means, covs)``.
+    """
+    Nk = np.maximum(Nk, 10 * np.finfo(float).eps)
+    means = Sk / Nk[:, None]
+    covs = Qk / Nk[:, None, None] - np.einsum("kd,ke->kde", means, means)
+    covs += reg_covar * np.eye(Sk.shape[1])
+    return Nk / Nk.sum(), means, covs
+
+
+class GaussianMixtureEM:
+    def __init__(self, num_components, tol=1e-6, max_iter=100,
+                 chunk_size=65536, reg_covar=1e-6, rng=None):
+        """ Constructor del ajuste por EM.
+
+        :param num_components: Número de componentes, $K$.
+        :param tol: El algoritmo se detiene cuando la log-verosimilitud media
+            por punto cambia menos que ``tol``.
+        :param max_iter: Número máximo de iteraciones.
+        :param chunk_size: Renglones por bloque en cada pasada sobre los datos.
+        :param reg_covar: Regularización de la diagonal de las covarianzas.
+        :param rng: Generador de NumPy para la inicialización.
+        """
+        self.num_components = num_components
+        self.tol = tol
+        self.max_iter = max_iter
+        self.chunk_size = chunk_size
+        self.reg_covar = reg_covar
+        self.rng = np.random.default_rng() if rng is None else rng
+
+    def _chunks(self, X):
+        for start in range(0, X.shape[0], self.chunk_size):
+            yield X[start:start + self.chunk_size]
+
+    def init_params(self, X):
+        """ Medias en puntos elegidos al azar, covarianzas iguales a la
+        covarianza diagonal de los datos y pesos uniformes.
+        """
+        K, D = self.num_components, X.shape[1]
+        idx = self.rng.choice(X.shape[0], size=K, replace=False)
+        self.means_ = np.array(X[idx], dtype=float)
+        cov = np.diag(np.var(X, axis=0)) + self.reg_covar * np.eye(D)
+        self.covs_ = np.tile(cov, (K, 1, 1))
+        self.weights_ = np.full(K, 1.0 / K)
+
+    def e_step(self, X):
+        """ Recorre los datos por bloques y acumula los momentos ponderados.
+
+        :return: Tupla ``(Nk, Sk, Qk, log_like)`` con ``log_like`` la
+            log-verosimilitud total.
+        """
+        K, D = self.num_components, X.shape[1]
+        Nk, Sk, Qk = np.zeros(K), np.zeros((K, D)), np.zeros((K, D, D))
+        total = 0.0
+        P, log_det = precision_cholesky(self.covs_)
+        for chunk in self._chunks(X):
+            log_resp, log_like = log_responsibilities(
+                chunk, self.weights_, self.means_, P, log_det)
+            n_k, s_k, q_k = weighted_moments(chunk, np.exp(log_resp))
+            Nk += n_k
+            Sk += s_k
+            Qk += q_k
+            total += log_like.sum()
+        return Nk, Sk, Qk, total
+
+    def fit(self, X, weights=None, means=None, covs=None):
+        """ Ajusta la mezcla con EM.
+
+        :param X: Arreglo (n, D) de datos (puede ser un ``np.memmap``).
+        :param weights: Pesos iniciales (opcional).
+        :param means: Medias iniciales (opcional).
+        :param covs: Covarianzas iniciales (opcional).
+        :return: La misma instancia, con ``weights_``, ``means_``, ``covs_``,
+            ``log_likelihood_`` (lista con la log-verosimilitud media por
+            iteración), ``n_iter_`` y ``converged_``.
+        """
+        X = np.asarray(X)
+        self.init_params(X)
+        if weights is not None:
+            self.weights_ = np.asarray(weights, dtype=float).ravel()
+        if means is not None:
+            self.means_ = np.asarray(means, dtype=float)
+        if covs is not None:
+            self.covs_ = np.asarray(covs, dtype=float)
+
+        n = X.shape[0]
+        self.log_likelihood_ = []
+        self.converged_ = False
+        for em_iter in range(self.max_iter):
+            Nk, Sk, Qk, total = self.e_step(X)
+            self.log_likelihood_.append(total / n)
+            self.weights_, self.means_, self.covs_ = moments_to_params(
+                Nk, Sk, Qk, self.reg_covar)
+            if (em_iter > 0 and abs(self.log_likelihood_[-1]
+                                    - self.log_likelihood_[-2]) < self.tol):
+                self.converged_ = True
+                break
+        self.n_iter_ = em_iter + 1
+        return self
+
+    def predict_proba(self, X):
+        """ Responsabilidades de cada punto, de forma (n, K). """
+        P, log_det = precision_cholesky(self.covs_)
+        log_resp, _ = log_responsibilities(np.asarray(X), self.weights_,
+                                           self.means_, P, log_det)
+        return np.exp(log_resp)
+
+    def score(self, X):
+        """ Log-verosimilitud media por punto. """
+        P, log_det = precision_cholesky(self.covs_)
+        return np.mean(np.concatenate([
+            log_responsibilities(chunk, self.weights_, self.means_, P, log_det)[1]
+            for chunk in self._chunks(np.asarray(X))]))
+
+
+def iter_batches(X, batch_size):
+    """ Mini-lotes consecutivos de un arreglo (por ejemplo un ``np.memmap``).
+
+    :param X: Arreglo (n, D).
+    :param batch_size: Renglones por lote.
+    """
+    for start in range(0, X.shape[0], batch_size):
+        yield np.asarray(X[start:start + batch_size], dtype=float)
+
+
+class OnlineGaussianMixtureEM(GaussianMixtureEM):
+    def __init__(self, num_components, kappa=0.6, t0=2.0, reg_covar=1e-6,
+                 rng=None):
+        """ Constructor del EM por pasos.
+
+        :param num_components: Número de componentes, $K$.
+        :param kappa: Exponente del tamaño de paso, en $(1/2, 1]$.
+        :param t0: Retraso del tamaño de paso; valores grandes dan más peso a
+            los momentos iniciales.
+        :param reg_covar: Regularización de la diagonal de las covarianzas.
+        :param rng: Generador de NumPy para la inicialización.
+        """
+        super().__init__(num_components, reg_covar=reg_covar, rng=rng)
+        self.kappa = kappa
+        self.t0 = t0
+        self.n_batches_ = 0
+        self.n_seen_ = 0
+
+    def _params_to_moments(self):
+        w, mu = self.weights_, self.means_
+        second = self.covs_ + np.einsum("kd,ke->kde", mu, mu)
+        return w, w[:, None] * mu, w[:, None, None] * second
+
+    def partial_fit(self, batch):
+        """ Actualiza el modelo con un mini-lote.
+
+        Si no hay parámetros, se inicializan con el primer lote. Mientras no
+        hayan llegado al menos $K$ renglones (para elegir $K$ medias
+        distintas) los lotes solo se guardan, y se procesan juntos como el
+        primer lote.
+
+        :param batch: Arreglo (m, D).
+        :return: La misma instancia.
+        """
+        batch = np.asarray(batch, dtype=float)
+        if not hasattr(self, "means_"):
+            pending = getattr(self, "_pending", [])
+            pending.append(batch)
+            if sum(b.shape[0] for b in pending) < self.num_components:
+                self._pending = pending
+                return self
+            batch = np.concatenate(pending)
+            self._pending = []
+            self.init_params(batch)
+        if not hasattr(self, "_moments"):
+            self._moments = self._params_to_moments()
+
+        P, log_det = precision_cholesky(self.covs_)
+        log_resp, _ = log_responsibilities(batch, self.weights_, self.means_,
+                                           P, log_det)
+        m = batch.shape[0]
+        batch_moments = [v / m for v in weighted_moments(batch, np.exp(log_resp))]
+
+        self.n_batches_ += 1
+        self.n_seen_ += m
+        eta = (self.n_batches_ + self.t0) ** (-self.kappa)
+        self._moments = tuple((1 - eta) * old + eta * new
+                              for old, new in zip(self._moments, batch_moments))
+        self.weights_, self.means_, self.covs_ = moments_to_params(
+            *self._moments, self.reg_covar)
+        return self
+
+    def snapshot(self):
+        """ Copia de los parámetros actuales. """
+        return {"n_batches": self.n_batches_, "n_seen": self.n_seen_,
+                "weights": self.weights_.copy(), "means": self.means_.copy(),
+                "covs": self.covs_.copy()}
+
+    def fit_stream(self, batches, snapshot_every=1):
+        """ Consume un flujo de mini-lotes y emite instantáneas del modelo.
+
+        :param batches: Iterable de arreglos (m, D), por ejemplo
+            ``iter_batches(np.load(path, mmap_mode="r"), 10_000)``.
+        :param snapshot_every: Cada cuántos lotes se emite una instantánea.
+        :return: Generador de diccionarios con ``n_batches``, ``n_seen``,
+            ``weights``, ``means`` y ``covs``.
+        """
+        for batch in batches:
+            self.partial_fit(batch)
+            if self.n_batches_ and self.n_batches_ % snapshot_every == 0:
+                yield self.snapshot()
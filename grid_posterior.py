@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""Distribuciones posteriores en rejilla, en escala logarítmica y por lotes.
+
+Generaliza ``posterior_discrete`` (bayesiana_ejemplo1.py) a:
+
+1. Muchos conjuntos de datos a la vez: ``data`` es un arreglo de tamaño
+   ``(m, k)`` (por ejemplo ``(m, 2)`` con éxitos y fracasos) y la posterior de
+   cada renglón se calcula en una sola operación vectorizada.
+2. Rejillas de parámetros de 1, 2 o 3 dimensiones.
+3. Cálculos en escala logarítmica: la verosimilitud $p^{s}(1-p)^{f}$ se
+   evalúa como $s\\log p + f\\log(1-p)$ y se normaliza con log-sum-exp, de modo
+   que no hay subdesbordamiento aun con conteos grandes.
+
+Ejemplo::
+
+    p = np.linspace(0.05, 0.95, 10)
+    prior = np.array([1, 5.2, 8, 7.2, 4.6, 2.1, 0.7, 0.1, 0, 0])
+    data = np.array([[11, 16], [1100, 1600]])
+    post = GridPosterior([p], prior).fit(binomial_log_likelihood, data)
+    post.probs           # (2, 10)
+    post.quantile(0.5)   # (2,)
+"""
+
+import numpy as np
+from scipy.special import logsumexp, xlogy, xlog1py
+
+
+def binomial_log_likelihood(data, p):
+    """ Log-verosimilitud binomial (sin la constante combinatoria).
+
+    :param data: Arreglo (m, 2) con éxitos y fracasos de cada conjunto de datos.
+    :param p: Arreglo de proporciones de tamaño (1, n).
+    :return: Arreglo (m, n) con $s\\log p + f\\log(1-p)$.
+    """
+    data = np.asarray(data, dtype=float)
+    s = data[:, 0].reshape((-1,) + (1,) * (p.ndim - 1))
+    f = data[:, 1].reshape((-1,) + (1,) * (p.ndim - 1))
+    return xlogy(s, p) + xlog1py(f, -p)
+
+
+class GridPosterior:
+    def __init__(self, axes, prior=None, log_prior=None):
+        """ Constructor de la posterior en rejilla.
+
+        :param axes: Lista con 1, 2 o 3 arreglos 1-D; cada uno es la rejilla de
+            un parámetro.
+        :param prior: Pesos iniciales (no necesariamente normalizados) con la
+            forma de la rejilla. Si no se da ``prior`` ni ``log_prior`` se usa
+            una inicial uniforme.
+        :param log_prior: Logaritmo de los pesos iniciales, alternativa a
+            ``prior``.
+        """
+        self.axes = [np.asarray(ax, dtype=float) for ax in axes]
+        if not 1 <= len(self.axes) <= 3:
+            raise ValueError("Solo se admiten rejillas de 1, 2 o 3 dimensiones.")
+        self.shape = tuple(ax.size for ax in self.axes)
+
+        if prior is not None and log_prior is not None:
+            raise ValueError("Dar solo uno de prior o log_prior.")
+        if prior is not None:
+            with np.errstate(divide="ignore"):
+                log_prior = np.log(np.asarray(prior, dtype=float))
+        if log_prior is None:
+            log_prior = np.zeros(self.shape)
+        log_prior = np.broadcast_to(log_prior, self.shape)
+        self.log_prior = log_prior - logsumexp(log_prior)
+
+        # Rejilla en forma (1, n1, ..., nd) para que broadcastee contra los datos.
+        self.mesh = [g[None] for g in np.meshgrid(*self.axes, indexing="ij")]
+        self.log_post = None
+
+    @property
+    def _grid_axes(self):
+        return tuple(range(1, len(self.axes) + 1))
+
+    def fit(self, log_like, data):
+        """ Calcula la posterior de cada conjunto de datos.
+
+        :param log_like: Función ``log_like(data, *mesh)`` que regresa un
+            arreglo (m, n1, ..., nd) con la log-verosimilitud de cada renglón de
+            ``data`` en cada punto de la rejilla. Cada elemento de ``mesh`` tiene
+            forma (1, n1, ..., nd).
+        :param data: Arreglo (m, k) con un conjunto de datos por renglón.
+        :return: La misma instancia, con ``log_post`` de forma (m, n1, ..., nd).
+        """
+        data = np.atleast_2d(data)
+        log_post = log_like(data, *self.mesh) + self.log_prior
+        log_post -= logsumexp(log_post, axis=self._grid_axes, keepdims=True)
+        self.log_post = log_post
+        return self
+
+    @property
+    def probs(self):
+        """ Probabilidades posteriores, de forma (m, n1, ..., nd). """
+        return np.exp(self.log_post)
+
+    def marginal(self, axis=0):
+        """ Distribución posterior marginal de un parámetro.
+
+        :param axis: Índice del parámetro (0, 1 o 2).
+        :return: Arreglo (m, n_axis).
+        """
+        others = tuple(a for a in self._grid_axes if a != axis + 1)
+        return np.exp(logsumexp(self.log_post, axis=others))
+
+    def mean(self, axis=0):
+        """ Media posterior de un parámetro para cada conjunto de datos.
+
+        :param axis: Índice del parámetro.
+        :return: Arreglo (m,).
+        """
+        return self.marginal(axis) @ self.axes[axis]
+
+    def quantile(self, q, axis=0):
+        """ Cuantiles de la marginal posterior de un parámetro.
+
+        Se regresa el menor punto de la rejilla cuya probabilidad acumulada es
+        al menos ``q``.
+
+        :param q: Orden del cuantil, escalar o arreglo 1-D.
+        :param axis: Índice del parámetro.
+        :return: Arreglo (m,) si ``q`` es escalar, o (m, len(q)).
+        """
+        q_arr = np.atleast_1d(np.asarray(q, dtype=float))
+        cdf = np.cumsum(self.marginal(axis), axis=-1)
+        idx = (cdf[:, None, :] < q_arr[None, :, None]).sum(axis=-1)
+        idx = np.minimum(idx, cdf.shape[-1] - 1)
+        out = self.axes[axis][idx]
+        return out[:, 0] if np.ndim(q) == 0 else out
+
+    def hpd(self, mass=0.95):
+        """ Conjuntos de máxima densidad posterior (HPD) en la rejilla.
+
+        Para cada conjunto de datos se toman los puntos de la rejilla en orden
+        decreciente de probabilidad hasta acumular al menos ``mass``.
+
+        :param mass: Probabilidad mínima del conjunto.
+        :return: Arreglo booleano (m, n1, ..., nd); ``True`` marca los puntos
+            que pertenecen al conjunto HPD.
+        """
+        m = self.log_post.shape[0]
+        flat = self.log_post.reshape(m, -1)
+        order = np.argsort(-flat, axis=1)
+        sorted_probs = np.exp(np.take_along_axis(flat, order, axis=1))
+        before = np.cumsum(sorted_probs, axis=1) - sorted_probs
+        keep = np.zeros(flat.shape, dtype=bool)
+        np.put_along_axis(keep, order, before < mass, axis=1)
+        return keep.reshape(self.log_post.shape)
+
+
+def posterior_discrete_batch(p, prior, data):
+    """ Versión por lotes y en escala logarítmica de ``posterior_discrete``.
+
+    :param p: Arreglo de valores de la proporción.
+    :param prior: Arreglo con las probabilidades iniciales para las proporciones.
+    :param data: Arreglo (m, 2) de éxitos / fracasos, o un solo par.
+    :return: Arreglo (m, len(p)) con la distribución posterior de cada renglón.
+    """
+    assert len(p) == len(prior)
+
+    post = GridPosterior([p], prior).fit(binomial_log_likelihood, data)
+    return post.probs
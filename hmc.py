@@ -0,0 +1,330 @@
+# -*- coding: utf-8 -*-
+"""Monte Carlo Hamiltoniano (HMC) y No-U-Turn Sampler (NUTS).
+
+Alternativa con gradiente a ``NormalMetropolis`` (bayesiana_3.py) para
+posteriores donde la caminata aleatoria mezcla mal. Se introduce un momento
+$r \\sim \\mathcal{N}(0, M)$ y se simula la dinámica de
+$H(\\theta, r) = -\\log \\pi(\\theta) + \\frac{1}{2} r^T M^{-1} r$ con el
+integrador leapfrog:
+
+$$
+r \\leftarrow r + \\frac{\\epsilon}{2}\\nabla\\log\\pi(\\theta), \\quad
+\\theta \\leftarrow \\theta + \\epsilon M^{-1} r, \\quad
+r \\leftarrow r + \\frac{\\epsilon}{2}\\nabla\\log\\pi(\\theta).
+$$
+
+- ``HMC`` usa un número fijo de pasos leapfrog y acepta con Metropolis.
+- ``NUTS`` (Hoffman y Gelman 2014, Algoritmo 6) duplica la trayectoria hasta
+  que da una vuelta en U, así que no hay que elegir el número de pasos.
+
+En ambos casos el tamaño de paso $\\epsilon$ se ajusta durante el
+calentamiento con promediado dual para alcanzar una tasa de aceptación
+objetivo, y la masa diagonal $M^{-1}$ se estima con la varianza de las
+simulaciones de la primera mitad del calentamiento.
+
+``run(s, b, delta, theta_1)`` tiene la misma firma que ``Metropolis.run``:
+regresa la lista ``chain[b:]`` y deja los diagnósticos por iteración en el
+atributo ``diagnostics``.
+"""
+
+import numpy as np
+
+_DELTA_MAX = 1000.0
+
+
+def effective_sample_size(chain):
+    """ Tamaño efectivo de muestra por coordenada.
+
+    Usa la autocorrelación calculada con FFT y la secuencia inicial monótona
+    de Geyer: se suman los pares $\\rho_{2k} + \\rho_{2k+1}$ mientras sean
+    positivos y decrecientes.
+
+    :param chain: Arreglo (n,) o (n, d), o lista de estados.
+    :return: Arreglo (d,) (escalar si la cadena es 1-D).
+    """
+    x = np.asarray(chain, dtype=float)
+    scalar = x.ndim == 1
+    x = x.reshape(x.shape[0], -1)
+    n = x.shape[0]
+    x = x - x.mean(axis=0)
+    size = 1 << (2 * n - 1).bit_length()
+    f = np.fft.rfft(x, n=size, axis=0)
+    acov = np.fft.irfft(f * np.conj(f), n=size, axis=0)[:n] / n
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rho = acov / acov[0]
+
+    ess = np.empty(x.shape[1])
+    for j in range(x.shape[1]):
+        if not acov[0, j] > 0:
+            ess[j] = np.nan
+            continue
+        m = (n - 1) // 2
+        pairs = rho[:2 * m, j].reshape(m, 2).sum(axis=1)
+        neg = np.flatnonzero(pairs <= 0)
+        pairs = pairs[:neg[0] if neg.size else m]
+        pairs = np.minimum.accumulate(pairs)
+        tau = -1.0 + 2.0 * pairs.sum()
+        ess[j] = n / max(tau, 1.0 / np.log10(max(n, 10)))
+    return ess[0] if scalar else ess
+
+
+class DualAveraging:
+    def __init__(self, step_size, target_accept=0.8, gamma=0.05, t0=10.0,
+                 kappa=0.75):
+        """ Promediado dual de Nesterov para el tamaño de paso.
+
+        :param step_size: Tamaño de paso inicial.
+        :param target_accept: Estadístico de aceptación objetivo.
+        """
+        self.mu = np.log(10 * step_size)
+        self.target_accept = target_accept
+        self.gamma = gamma
+        self.t0 = t0
+        self.kappa = kappa
+        self.m = 0
+        self.h_bar = 0.0
+        self.log_eps = np.log(step_size)
+        self.log_eps_bar = 0.0
+
+    def update(self, accept_stat):
+        """ Actualiza con el estadístico de aceptación de la última iteración
+        y regresa el nuevo tamaño de paso.
+        """
+        self.m += 1
+        w = 1.0 / (self.m + self.t0)
+        self.h_bar = (1 - w) * self.h_bar + w * (self.target_accept - accept_stat)
+        self.log_eps = self.mu - np.sqrt(self.m) / self.gamma * self.h_bar
+        eta = self.m ** -self.kappa
+        self.log_eps_bar = eta * self.log_eps + (1 - eta) * self.log_eps_bar
+        return np.exp(self.log_eps)
+
+    @property
+    def final_step_size(self):
+        return np.exp(self.log_eps_bar)
+
+
+class HMC:
+    def __init__(self, log_density, grad_log_density, num_steps=10,
+                 target_accept=0.8, adapt_mass=True, rng=None):
+        """ Constructor del muestreador.
+
+        :param log_density: Función $\\theta \\mapsto \\log \\pi(\\theta)$ (salvo
+            constante).
+        :param grad_log_density: Función $\\theta \\mapsto \\nabla\\log\\pi(\\theta)$.
+        :param num_steps: Pasos leapfrog por iteración.
+        :param target_accept: Aceptación objetivo del promediado dual.
+        :param adapt_mass: Si se estima la masa diagonal en el calentamiento.
+        :param rng: Generador de NumPy.
+        """
+        self._log_density = log_density
+        self._grad = grad_log_density
+        self.num_steps = num_steps
+        self.target_accept = target_accept
+        self.adapt_mass = adapt_mass
+        self.rng = np.random.default_rng() if rng is None else rng
+        self.inv_mass = None
+
+    def _eval(self, theta):
+        """ $\\log\\pi(\\theta)$ como flotante y el gradiente como arreglo (d,).
+
+        Con un estado escalar, ``theta`` llega como arreglo (1,); una densidad
+        escrita elemento a elemento regresa entonces un arreglo (1,), que se
+        reduce con la suma.
+        """
+        logp = float(np.sum(self._log_density(theta)))
+        return logp, np.atleast_1d(np.asarray(self._grad(theta), dtype=float))
+
+    def _kinetic(self, r):
+        return 0.5 * np.dot(r, self.inv_mass * r)
+
+    def _momentum(self, d):
+        return self.rng.standard_normal(d) / np.sqrt(self.inv_mass)
+
+    def _leapfrog(self, theta, r, grad, eps):
+        r = r + 0.5 * eps * grad
+        theta = theta + eps * self.inv_mass * r
+        logp, grad = self._eval(theta)
+        r = r + 0.5 * eps * grad
+        return theta, r, logp, grad
+
+    def _initial_step_size(self, theta, logp, grad):
+        """ Heurística de Hoffman y Gelman: duplica o reduce $\\epsilon$ hasta
+        que la aceptación de un paso leapfrog cruce 1/2.
+        """
+        eps = 1.0
+        r = self._momentum(theta.size)
+        H0 = logp - self._kinetic(r)
+        _, r1, logp1, _ = self._leapfrog(theta, r, grad, eps)
+        log_ratio = np.nan_to_num(logp1 - self._kinetic(r1) - H0, nan=-np.inf)
+        a = 1.0 if log_ratio > np.log(0.5) else -1.0
+        for _ in range(100):
+            if not a * log_ratio > -a * np.log(2):
+                break
+            eps *= 2.0 ** a
+            _, r1, logp1, _ = self._leapfrog(theta, r, grad, eps)
+            log_ratio = np.nan_to_num(logp1 - self._kinetic(r1) - H0, nan=-np.inf)
+        return eps
+
+    def transition(self, theta, logp, grad, eps):
+        """ Una iteración de HMC con ``num_steps`` pasos leapfrog.
+
+        El tamaño de paso se perturba uniformemente en $\\pm 20\\%$ para evitar
+        trayectorias periódicas cuando la longitud es fija.
+
+        :return: ``(theta, logp, grad, info)`` con ``info`` un diccionario con
+            ``accept_stat``, ``n_leapfrog`` y ``divergent``.
+        """
+        r = self._momentum(theta.size)
+        H0 = logp - self._kinetic(r)
+        theta1, r1, logp1, grad1 = theta, r, logp, grad
+        eps = eps * self.rng.uniform(0.8, 1.2)
+        for _ in range(self.num_steps):
+            theta1, r1, logp1, grad1 = self._leapfrog(theta1, r1, grad1, eps)
+        log_ratio = np.nan_to_num(logp1 - self._kinetic(r1) - H0, nan=-np.inf)
+        info = {"accept_stat": min(1.0, np.exp(log_ratio)),
+                "n_leapfrog": self.num_steps,
+                "divergent": -log_ratio > _DELTA_MAX}
+        if np.log(self.rng.uniform()) < log_ratio:
+            return theta1, logp1, grad1, info
+        return theta, logp, grad, info
+
+    def run(self, s, b, delta, theta_1):
+        """ Corre la cadena.
+
+        :param s: Número de simulaciones a conservar.
+        :param b: Iteraciones de calentamiento (adaptación), que se descartan.
+        :param delta: Tamaño de paso inicial; si es ``None`` se elige con una
+            heurística.
+        :param theta_1: Estado inicial.
+        :return: Lista ``chain[b:]`` de ``s`` estados, como ``Metropolis.run``
+            (números si ``theta_1`` es escalar, arreglos si no).
+            ``self.diagnostics`` guarda los campos de ``info`` de
+            ``transition`` y el ``step_size`` de las iteraciones conservadas, y
+            ``self.step_size`` el tamaño de paso final.
+        """
+        theta = np.atleast_1d(np.asarray(theta_1, dtype=float))
+        if self.inv_mass is None:
+            self.inv_mass = np.ones(theta.size)
+        logp, grad = self._eval(theta)
+        eps = self._initial_step_size(theta, logp, grad) if delta is None else delta
+        adapt = DualAveraging(eps, self.target_accept)
+        mass_window = (b // 4, b // 2) if self.adapt_mass and b >= 20 else None
+
+        chain = [theta]
+        diagnostics = []
+        while len(chain) < s + b:
+            it = len(chain)
+            theta, logp, grad, info = self.transition(theta, logp, grad, eps)
+            chain.append(theta)
+            if it < b:
+                eps = adapt.update(info["accept_stat"])
+                if mass_window is not None and it == mass_window[1]:
+                    window = np.array(chain[mass_window[0]:])
+                    self.inv_mass = np.maximum(window.var(axis=0), 1e-8)
+                    eps = self._initial_step_size(theta, logp, grad)
+                    adapt = DualAveraging(eps, self.target_accept)
+                if it == b - 1:
+                    eps = adapt.final_step_size
+            else:
+                info["step_size"] = eps
+                diagnostics.append(info)
+
+        self.step_size = eps
+        keys = diagnostics[0].keys() if diagnostics else ()
+        self.diagnostics = {key: np.array([d[key] for d in diagnostics])
+                            for key in keys}
+        if np.ndim(theta_1) == 0:
+            return [state.item() for state in chain[b:]]
+        return chain[b:]
+
+
+class NUTS(HMC):
+    def __init__(self, log_density, grad_log_density, max_depth=10,
+                 target_accept=0.8, adapt_mass=True, rng=None):
+        """ No-U-Turn Sampler con tamaño de paso por promediado dual.
+
+        :param max_depth: Profundidad máxima del árbol (a lo más
+            $2^{\\text{max\\_depth}}$ pasos leapfrog por iteración).
+        """
+        super().__init__(log_density, grad_log_density, None, target_accept,
+                         adapt_mass, rng)
+        self.max_depth = max_depth
+
+    def _no_u_turn(self, theta_minus, theta_plus, r_minus, r_plus):
+        dtheta = theta_plus - theta_minus
+        return (np.dot(dtheta, self.inv_mass * r_minus) >= 0
+                and np.dot(dtheta, self.inv_mass * r_plus) >= 0)
+
+    def _build_tree(self, theta, r, grad, log_u, v, j, eps, H0):
+        """ Construye un subárbol de $2^j$ pasos en la dirección ``v``.
+
+        :return: ``(minus, plus, (theta', logp', grad'), n, s, alpha,
+            n_alpha)`` donde ``minus`` y ``plus`` son los extremos
+            ``(theta, r, grad)``.
+        """
+        if j == 0:
+            theta1, r1, logp1, grad1 = self._leapfrog(theta, r, grad, v * eps)
+            H1 = logp1 - self._kinetic(r1)
+            if np.isnan(H1):
+                H1 = -np.inf
+            end = (theta1, r1, grad1)
+            n1 = int(log_u <= H1)
+            s1 = log_u < H1 + _DELTA_MAX
+            self._divergent |= not s1
+            alpha = min(1.0, np.exp(H1 - H0))
+            return end, end, (theta1, logp1, grad1), n1, s1, alpha, 1
+
+        minus, plus, prop, n1, s1, alpha, n_alpha = self._build_tree(
+            theta, r, grad, log_u, v, j - 1, eps, H0)
+        if s1:
+            start = minus if v == -1 else plus
+            minus2, plus2, prop2, n2, s2, alpha2, n_alpha2 = self._build_tree(
+                *start, log_u, v, j - 1, eps, H0)
+            if v == -1:
+                minus = minus2
+            else:
+                plus = plus2
+            if n1 + n2 > 0 and self.rng.uniform() < n2 / (n1 + n2):
+                prop = prop2
+            alpha += alpha2
+            n_alpha += n_alpha2
+            s1 = s2 and self._no_u_turn(minus[0], plus[0], minus[1], plus[1])
+            n1 += n2
+        return minus, plus, prop, n1, s1, alpha, n_alpha
+
+    def transition(self, theta, logp, grad, eps):
+        """ Una iteración de NUTS.
+
+        :return: ``(theta, logp, grad, info)`` con ``info`` un diccionario con
+            ``accept_stat``, ``n_leapfrog``, ``divergent`` y ``tree_depth``.
+        """
+        r0 = self._momentum(theta.size)
+        H0 = logp - self._kinetic(r0)
+        log_u = H0 + np.log(self.rng.uniform())
+        minus = plus = (theta, r0, grad)
+        current = (theta, logp, grad)
+        n, keep_going, depth = 1, True, 0
+        self._divergent = False
+        alpha, n_alpha = 0.0, 0
+        while keep_going and depth < self.max_depth:
+            v = -1 if self.rng.uniform() < 0.5 else 1
+            start = minus if v == -1 else plus
+            new_minus, new_plus, prop, n1, s1, a1, na1 = self._build_tree(
+                *start, log_u, v, depth, eps, H0)
+            if v == -1:
+                minus = new_minus
+            else:
+                plus = new_plus
+            if s1 and self.rng.uniform() < n1 / n:
+                current = prop
+            n += n1
+            alpha += a1
+            n_alpha += na1
+            keep_going = s1 and self._no_u_turn(minus[0], plus[0], minus[1],
+                                                plus[1])
+            depth += 1
+        info = {"accept_stat": alpha / n_alpha, "n_leapfrog": n_alpha,
+                "divergent": self._divergent,
+                "tree_depth": depth}
+        return (*current, info)
+
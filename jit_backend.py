@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""Núcleos compilados (Numba) para los muestreadores de densidades escalares.
+
+``Metropolis.run`` (bayesiana_3.py), ``RejectingSampler.rejection_sampling``
+e ``ImportanceSampler.compute_IS_estimator`` (bayesiana_2.py) llaman en cada
+paso a funciones de Python como ``f_samp``/``f_ini``, ``f_obj``/``f_prop`` o
+``h``/``f``/``pi``/``p``, y el costo de cada llamada al intérprete domina el
+tiempo. Una cadena de Metropolis es secuencial y no se puede vectorizar, así
+que la única forma de acelerarla es compilar las densidades junto con el
+ciclo.
+
+Las funciones ``*_kernel`` reciben las densidades y regresan un núcleo que
+hace exactamente los mismos pasos (y en el mismo orden de llamadas a
+``np.random``) que el método correspondiente:
+
+- Si Numba está instalado, las densidades y el ciclo se compilan con
+  ``numba.njit``. La compilación ocurre en la primera llamada; si alguna
+  densidad no es compilable (p. ej. importa scipy dentro, como ``f_obj``) se
+  emite un aviso y se usa el camino de Python.
+- Si no, el núcleo es el mismo ciclo en Python puro.
+
+Con ``seed`` se fija el generador global de NumPy (o el de Numba dentro del
+código compilado), como hacen los notebooks con ``np.random.seed``.
+"""
+
+import warnings
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+HAS_NUMBA = numba is not None
+
+
+def _jit(func):
+    """ ``numba.njit(func)``, salvo que ``func`` ya esté compilada. """
+    return func if hasattr(func, "py_func") else numba.njit(func)
+
+
+class _Kernel:
+    def __init__(self, build, funcs, backend):
+        """ Núcleo con versión compilada opcional.
+
+        :param build: Función ``(*funcs, wrap)`` que arma el ciclo; ``wrap`` es
+            el decorador que se aplica al ciclo.
+        :param funcs: Densidades y generadores que usa el ciclo.
+        :param backend: ``"auto"``, ``"numba"`` o ``"python"``.
+        """
+        if backend not in ("auto", "numba", "python"):
+            raise ValueError(f"backend desconocido: {backend!r}")
+        if backend == "numba" and numba is None:
+            raise ImportError("backend='numba' requiere tener numba instalado")
+        self._python = build(*funcs, wrap=lambda f: f)
+        self._compiled = None
+        if numba is not None and backend != "python":
+            self._compiled = build(*map(_jit, funcs), wrap=numba.njit)
+        self._strict = backend == "numba"
+
+    @property
+    def backend(self):
+        """ ``"numba"`` o ``"python"``, según el camino que se usará. """
+        return "python" if self._compiled is None else "numba"
+
+    def __call__(self, *args, seed=None):
+        args = args + (-1 if seed is None else seed,)
+        if self._compiled is not None:
+            try:
+                return self._compiled(*args)
+            except numba.core.errors.NumbaError as e:
+                if self._strict:
+                    raise
+                warnings.warn(f"no se pudo compilar el núcleo, se usa Python: {e}")
+                self._compiled = None
+        return self._python(*args)
+
+
+def normal_proposal(theta_s, delta):
+    """ Propuesta de ``NormalMetropolis``: $\\mathcal{N}(\\theta_s, \\delta^2)$. """
+    return np.random.normal(theta_s, delta)
+
+
+def _build_metropolis(f_sampling, f_ini, proposal, wrap):
+    @wrap
+    def run(sample, s, b, delta, theta_1, seed):
+        if seed >= 0:
+            np.random.seed(seed)
+        chain = np.empty(s + b)
+        chain[0] = theta_1
+        current = np.sum(np.log(f_sampling(sample, theta_1))) + f_ini(theta_1)
+        size = 1
+        while size < s + b:
+            theta_star = proposal(chain[size - 1], delta)
+            new = np.sum(np.log(f_sampling(sample, theta_star))) + f_ini(theta_star)
+            u = np.random.uniform(0, 1)
+            if np.log(u) < new - current:
+                chain[size] = theta_star
+                current = new
+                size += 1
+        return chain[b:]
+    return run
+
+
+def metropolis_kernel(f_sampling, f_ini, proposal=normal_proposal,
+                      backend="auto"):
+    """ Núcleo equivalente a ``Metropolis.run`` (bayesiana_3.py).
+
+    Como en ``Metropolis``, el cociente usa
+    $\\sum\\log f(y_i | \\theta) + f_{ini}(\\theta)$ y la cadena solo crece
+    cuando se acepta la propuesta.
+
+    :param f_sampling: Densidad de muestreo ``(sample, theta)``.
+    :param f_ini: Término inicial ``(theta)``.
+    :param proposal: Generador ``(theta_s, delta)`` de la propuesta.
+    :param backend: ``"auto"`` (Numba si está instalado), ``"numba"`` o
+        ``"python"``.
+    :return: Función ``(sample, s, b, delta, theta_1, seed=None)`` que regresa
+        el arreglo ``chain[b:]``; su atributo ``backend`` indica el camino.
+    """
+    return _Kernel(_build_metropolis, (f_sampling, f_ini, proposal), backend)
+
+
+def _build_rejection(f_obj, f_prop, draw, wrap):
+    @wrap
+    def run(n, c, seed):
+        if seed >= 0:
+            np.random.seed(seed)
+        obj_sample = np.empty(n)
+        size = 0
+        for i in range(n):
+            x_i = draw()
+            u_i = np.random.uniform(0, 1)
+            if u_i <= f_obj(x_i) / (c * f_prop(x_i)):
+                obj_sample[size] = x_i
+                size += 1
+        return obj_sample[:size], size / n
+    return run
+
+
+def rejection_kernel(f_obj, f_prop, draw, backend="auto"):
+    """ Núcleo equivalente a ``RejectingSampler.rejection_sampling``.
+
+    :param f_obj: Distribución objetivo.
+    :param f_prop: Distribución propuesta.
+    :param draw: Función sin argumentos que simula de la propuesta (el
+        ``draw_from_f_prop`` de la subclase).
+    :param backend: ``"auto"``, ``"numba"`` o ``"python"``.
+    :return: Función ``(n, c, seed=None)`` que regresa la tupla
+        ``(muestra, tasa de aceptación)`` con la muestra como arreglo.
+    """
+    return _Kernel(_build_rejection, (f_obj, f_prop, draw), backend)
+
+
+def _build_importance(h, f, pi, p, draw, wrap):
+    @wrap
+    def run(n, seed):
+        if seed >= 0:
+            np.random.seed(seed)
+        estimator_num = 0.0
+        estimator_den = 0.0
+        for i in range(n):
+            theta_i = draw()
+            w_i = f(theta_i) * pi(theta_i) / p(theta_i)
+            estimator_num += h(theta_i) * w_i
+            estimator_den += w_i
+        return estimator_num / estimator_den
+    return run
+
+
+def importance_kernel(h, f, pi, p, draw, backend="auto"):
+    """ Núcleo equivalente a ``ImportanceSampler.compute_IS_estimator``.
+
+    :param h: Función del parámetro.
+    :param f: Función de verosimilitud.
+    :param pi: Distribución inicial.
+    :param p: Distribución propuesta.
+    :param draw: Función sin argumentos que simula de la propuesta (p. ej.
+        ``lambda: np.random.gamma(2.0, 1.0)`` para ``GammaInvIS``).
+    :param backend: ``"auto"``, ``"numba"`` o ``"python"``.
+    :return: Función ``(n, seed=None)`` que regresa el estimador.
+    """
+    return _Kernel(_build_importance, (h, f, pi, p, draw), backend)
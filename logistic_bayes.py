@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""Regresión logística bayesiana: moda posterior, aproximación de Laplace y
+refinamiento por Metropolis-Hastings independiente o muestreo por importancia.
+
+Es la versión en Python del modelo de MultiParamLogisticBayesianRegModel.Rmd:
+$y_i \\sim \\text{Bin}(n_i, p_i)$ con $\\text{logit}(p_i) = x_i^T\\beta$ y una
+inicial normal $\\beta \\sim \\mathcal{N}(\\mu_0, \\Sigma_0)$ (o plana). Una
+inicial de medias condicionales como la del Rmd se obtiene agregando los datos
+previos como renglones de ``X``, ``y`` y ``n``.
+
+Con $\\eta = X\\beta$ y $p = \\text{expit}(\\eta)$, en una sola pasada sobre ``X``:
+
+$$
+\\begin{align*}
+\\log \\pi(\\beta | y) &= \\sum_i y_i\\eta_i - n_i\\log(1 + e^{\\eta_i})
+    - \\frac{1}{2}(\\beta - \\mu_0)^T\\Sigma_0^{-1}(\\beta - \\mu_0) \\\\
+\\nabla &= X^T(y - np) - \\Sigma_0^{-1}(\\beta - \\mu_0) \\\\
+H &= -X^T\\text{diag}(np(1-p))X - \\Sigma_0^{-1}
+\\end{align*}
+$$
+
+La verosimilitud es un producto matriz-vector (``X @ beta``) por evaluación, y
+para muchos valores de $\\beta$ a la vez un producto matriz-matriz por bloque de
+renglones y de valores de $\\beta$. En ambos casos se recorre ``X`` por
+bloques, así que la memoria adicional no crece con $N$.
+"""
+
+import numpy as np
+from scipy.special import expit, logsumexp
+
+
+class BayesLogisticRegression:
+    def __init__(self, X, y, n=None, prior_mean=None, prior_cov=None,
+                 chunk_size=1_000_000):
+        """ Constructor del modelo.
+
+        :param X: Matriz de diseño (N, d) (incluir la columna de unos).
+        :param y: Número de éxitos por renglón (N,).
+        :param n: Número de ensayos por renglón (N,); por defecto 1.
+        :param prior_mean: Media de la inicial normal (d,); por defecto 0.
+        :param prior_cov: Covarianza de la inicial normal (d, d); si es
+            ``None`` la inicial es plana.
+        :param chunk_size: Tamaño de bloque: renglones de ``X`` por bloque
+            en ``log_post`` y elementos (renglones por valores de $\\beta$)
+            de cada bloque de $X\\beta$ en ``log_post_many``.
+        """
+        self.X = np.asarray(X)
+        self.y = np.asarray(y, dtype=float)
+        self.n = np.ones_like(self.y) if n is None else np.asarray(n, dtype=float)
+        d = self.X.shape[1]
+        self.prior_mean = np.zeros(d) if prior_mean is None else np.asarray(
+            prior_mean, dtype=float)
+        self.prior_prec = (np.zeros((d, d)) if prior_cov is None
+                           else np.linalg.inv(prior_cov))
+        self.chunk_size = chunk_size
+
+    def log_post(self, beta, derivatives=2):
+        """ Log-posterior (sin constante) y, opcionalmente, gradiente y
+        hessiana.
+
+        :param beta: Arreglo (d,).
+        :param derivatives: 0, 1 o 2: cuántas derivadas calcular.
+        :return: ``lp``, ``(lp, grad)`` o ``(lp, grad, hess)``.
+        """
+        beta = np.asarray(beta, dtype=float)
+        diff = beta - self.prior_mean
+        prior_grad = self.prior_prec @ diff
+        lp = -0.5 * diff @ prior_grad
+        grad = -prior_grad
+        hess = -self.prior_prec
+        for start in range(0, self.X.shape[0], self.chunk_size):
+            sl = slice(start, start + self.chunk_size)
+            X, y, n = self.X[sl], self.y[sl], self.n[sl]
+            eta = X @ beta
+            lp += y @ eta - n @ np.logaddexp(0, eta)
+            if derivatives == 0:
+                continue
+            p = expit(eta)
+            grad = grad + X.T @ (y - n * p)
+            if derivatives == 2:
+                w = n * p * (1 - p)
+                hess = hess - X.T @ (w[:, None] * X)
+        if derivatives == 0:
+            return lp
+        if derivatives == 1:
+            return lp, grad
+        return lp, grad, hess
+
+    def log_post_many(self, betas):
+        """ Log-posterior para muchos valores de $\\beta$ a la vez.
+
+        Cada bloque de $X\\beta$ tiene a lo más ``chunk_size`` elementos:
+        hasta 1024 valores de $\\beta$ por los renglones que quepan.
+
+        :param betas: Arreglo (m, d).
+        :return: Arreglo (m,).
+        """
+        betas = np.atleast_2d(betas)
+        m = betas.shape[0]
+        lp = np.zeros(m)
+        num_draws = max(1, min(m, 1024, self.chunk_size))
+        num_rows = max(1, self.chunk_size // num_draws)
+        for j in range(0, m, num_draws):
+            draws = slice(j, j + num_draws)
+            for start in range(0, self.X.shape[0], num_rows):
+                sl = slice(start, start + num_rows)
+                eta = self.X[sl] @ betas[draws].T
+                lp[draws] += (self.y[sl] @ eta
+                              - self.n[sl] @ np.logaddexp(0, eta))
+        diff = betas - self.prior_mean
+        lp -= 0.5 * np.einsum("mi,ij,mj->m", diff, self.prior_prec, diff)
+        return lp
+
+    def laplace(self, beta0=None, tol=1e-8, max_iter=100):
+        """ Moda posterior por Newton-Raphson y aproximación de Laplace,
+        $\\beta | y \\approx \\mathcal{N}(\\hat\\beta, (-H(\\hat\\beta))^{-1})$.
+
+        El paso de Newton se reduce a la mitad mientras no aumente la
+        log-posterior.
+
+        :param beta0: Punto inicial; por defecto la media inicial.
+        :param tol: Tolerancia en la norma del paso.
+        :param max_iter: Número máximo de iteraciones.
+        :return: Tupla ``(mode, cov)``; también se guardan en ``self.mode`` y
+            ``self.cov``.
+        """
+        beta = self.prior_mean.copy() if beta0 is None else np.array(
+            beta0, dtype=float)
+        lp, grad, hess = self.log_post(beta)
+        for _ in range(max_iter):
+            step = np.linalg.solve(-hess, grad)
+            for _ in range(30):
+                new_lp = self.log_post(beta + step, derivatives=0)
+                if new_lp >= lp:
+                    break
+                step *= 0.5
+            beta = beta + step
+            lp, grad, hess = self.log_post(beta)
+            if np.linalg.norm(step) < tol:
+                break
+        else:
+            raise RuntimeError("Newton-Raphson no convergió.")
+        self.mode = beta
+        self.cov = np.linalg.inv(-hess)
+        self.cov = 0.5 * (self.cov + self.cov.T)
+        return self.mode, self.cov
+
+    def _proposal(self, size, scale, rng):
+        if not hasattr(self, "mode"):
+            self.laplace()
+        L = np.linalg.cholesky(scale ** 2 * self.cov)
+        z = rng.standard_normal((size, self.mode.size))
+        draws = self.mode + z @ L.T
+        log_q = -0.5 * np.sum(z * z, axis=1)
+        return draws, log_q
+
+    def independence_mh(self, n_draws, scale=1.0, rng=None):
+        """ Metropolis-Hastings independiente con la normal de Laplace como
+        propuesta.
+
+        Todas las propuestas y sus log-posteriores se calculan de una vez con
+        ``log_post_many``; el ciclo de aceptación solo compara escalares.
+
+        :param n_draws: Tamaño de la cadena.
+        :param scale: Factor para la desviación de la propuesta (>1 da colas
+            más pesadas).
+        :param rng: Generador de NumPy.
+        :return: Tupla ``(chain, acep_rate)`` con ``chain`` de forma
+            (n_draws, d).
+        """
+        rng = np.random.default_rng() if rng is None else rng
+        draws, log_q = self._proposal(n_draws, scale, rng)
+        log_w = self.log_post_many(draws) - log_q
+        log_u = np.log(rng.uniform(size=n_draws))
+
+        chain = np.empty_like(draws)
+        current, current_w = self.mode, self.log_post(self.mode, 0)
+        accepted = 0
+        for i in range(n_draws):
+            if log_u[i] < log_w[i] - current_w:
+                current, current_w = draws[i], log_w[i]
+                accepted += 1
+            chain[i] = current
+        return chain, accepted / n_draws
+
+    def importance_sampling(self, n_draws, scale=1.0, rng=None):
+        """ Muestreo por importancia con la normal de Laplace como propuesta.
+
+        :param n_draws: Número de simulaciones.
+        :param scale: Factor para la desviación de la propuesta.
+        :param rng: Generador de NumPy.
+        :return: Tupla ``(draws, weights, ess)`` con pesos normalizados y el
+            tamaño efectivo de muestra $1/\\sum_i w_i^2$.
+        """
+        rng = np.random.default_rng() if rng is None else rng
+        draws, log_q = self._proposal(n_draws, scale, rng)
+        log_w = self.log_post_many(draws) - log_q
+        weights = np.exp(log_w - logsumexp(log_w))
+        return draws, weights, 1.0 / np.sum(weights ** 2)
@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+"""Caché por contenido para cálculos posteriores repetidos.
+
+``beta_select``, ``posterior_discrete``, ``g_prior_sample`` (baye_s10.py) y
+los estimadores por importancia se llaman muchas veces con las mismas
+iniciales y los mismos datos. ``MemoCache`` guarda sus resultados bajo una
+llave que es el SHA-256 de (modelo, argumentos, semilla):
+
+- los arreglos de NumPy se codifican por tipo, forma y bytes, de modo que
+  dos copias iguales de los datos dan la misma llave (conviene pasar
+  estadísticas suficientes, como el par éxitos/fracasos, en lugar de los
+  datos crudos);
+- los escalares, cadenas, ``None``, tuplas, listas y diccionarios se
+  codifican recursivamente; cualquier otro tipo (p. ej. un
+  ``np.random.Generator``) es un error, porque no tiene contenido estable.
+
+Hay dos niveles: uno en memoria, LRU, acotado por número de entradas y
+opcionalmente por bytes de arreglos, y uno opcional en disco (un ``pickle``
+por llave) que sobrevive entre procesos. ``stats()`` reporta aciertos en
+cada nivel, fallos y desalojos.
+
+Ejemplo::
+
+    cache = MemoCache(max_entries=10_000, disk_dir=".memo_cache")
+    cached_post = memoize(cache)(posterior_discrete)
+    cached_post(p, prior, np.array([11, 16]))
+    cached_g = memoize(cache, seeded=True)(g_prior_sample)
+    cached_g(X, Y, g, nu_0, sigma_0_2, 1000, seed=0)
+
+Los arreglos que se regresan desde la caché son de solo lectura, para que
+un llamador no altere el resultado que verán los demás.
+"""
+
+from collections import OrderedDict
+import functools
+import hashlib
+import os
+import pickle
+import struct
+import tempfile
+
+import numpy as np
+
+
+def _encode(value, digest):
+    """ Agrega al ``digest`` una codificación sin ambigüedad de ``value``. """
+    if isinstance(value, np.ndarray):
+        value = np.ascontiguousarray(value)
+        if value.dtype.hasobject:
+            raise TypeError("no se pueden usar arreglos de objetos como llave")
+        digest.update(b"A" + value.dtype.str.encode()
+                      + repr(value.shape).encode())
+        digest.update(value.tobytes())
+    elif value is None or isinstance(value, (bool, np.bool_)):
+        digest.update(b"N" + repr(value).encode())
+    elif isinstance(value, (int, np.integer)):
+        digest.update(b"I" + str(int(value)).encode() + b";")
+    elif isinstance(value, (float, np.floating)):
+        digest.update(b"F" + struct.pack("<d", float(value)))
+    elif isinstance(value, str):
+        data = value.encode()
+        digest.update(b"S" + str(len(data)).encode() + b":" + data)
+    elif isinstance(value, bytes):
+        digest.update(b"B" + str(len(value)).encode() + b":" + value)
+    elif isinstance(value, (tuple, list)):
+        digest.update(b"T" + str(len(value)).encode() + b"(")
+        for item in value:
+            _encode(item, digest)
+    elif isinstance(value, dict):
+        digest.update(b"D" + str(len(value)).encode() + b"{")
+        for key in sorted(value, key=repr):
+            _encode(key, digest)
+            _encode(value[key], digest)
+    else:
+        raise TypeError(f"no se puede usar {type(value).__name__} en una llave")
+
+
+def content_key(model, *args, **kwargs):
+    """ Llave hexadecimal SHA-256 de ``(model, args, kwargs)``. """
+    digest = hashlib.sha256()
+    _encode((model, args, kwargs), digest)
+    return digest.hexdigest()
+
+
+def _freeze(value):
+    """ Marca como de solo lectura los arreglos de ``value``. """
+    if isinstance(value, np.ndarray):
+        value.flags.writeable = False
+    elif isinstance(value, (tuple, list)):
+        for item in value:
+            _freeze(item)
+    elif isinstance(value, dict):
+        for item in value.values():
+            _freeze(item)
+    return value
+
+
+def _nbytes(value):
+    """ Bytes de los arreglos dentro de ``value`` (aproximado). """
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sum(_nbytes(item) for item in value)
+    if isinstance(value, dict):
+        return sum(_nbytes(item) for item in value.values())
+    return 64
+
+
+class MemoCache:
+    def __init__(self, max_entries=1024, max_bytes=None, disk_dir=None):
+        """ Constructor de la caché.
+
+        :param max_entries: Máximo de entradas en memoria.
+        :param max_bytes: Máximo aproximado de bytes en memoria (opcional).
+        :param disk_dir: Directorio del nivel en disco (opcional).
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self._entries = OrderedDict()
+        self._nbytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries or (
+            self.disk_dir is not None and os.path.exists(self._disk_path(key)))
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key[:2], key + ".pkl")
+
+    def _put_memory(self, key, value):
+        size = _nbytes(value)
+        if key in self._entries:
+            self._nbytes -= self._entries.pop(key)[1]
+        self._entries[key] = (value, size)
+        self._nbytes += size
+        while len(self._entries) > self.max_entries or (
+                self.max_bytes is not None and self._nbytes > self.max_bytes
+                and len(self._entries) > 1):
+            _, (_, old_size) = self._entries.popitem(last=False)
+            self._nbytes -= old_size
+            self.evictions += 1
+
+    def _put_disk(self, key, value):
+        path = self._disk_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Nombre temporal único por proceso e hilo; se renombra al final
+        # para que un lector nunca vea un archivo a medio escribir.
+        fd, tmp = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+    def get(self, key, default=None):
+        """ Valor guardado bajo ``key`` (lo sube a memoria si estaba solo en
+        disco), o ``default``. Cuenta aciertos y fallos; un archivo en disco
+        que no se puede leer se borra y cuenta como fallo.
+        """
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key][0]
+        if self.disk_dir is not None:
+            path = self._disk_path(key)
+            try:
+                with open(path, "rb") as f:
+                    value = _freeze(pickle.load(f))
+            except FileNotFoundError:
+                pass
+            except (EOFError, pickle.UnpicklingError, OSError):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            else:
+                self.disk_hits += 1
+                self._put_memory(key, value)
+                return value
+        self.misses += 1
+        return default
+
+    def put(self, key, value):
+        """ Guarda ``value`` en memoria y, si hay, en disco. """
+        value = _freeze(value)
+        self._put_memory(key, value)
+        if self.disk_dir is not None:
+            self._put_disk(key, value)
+        return value
+
+    def get_or_compute(self, key, compute):
+        """ Valor de ``key``, calculándolo con ``compute()`` si no está. """
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            value = self.put(key, compute())
+        return value
+
+    def clear(self, disk=False):
+        """ Vacía el nivel en memoria (y el de disco si ``disk``, incluidos
+        los temporales que hayan quedado de escrituras interrumpidas).
+        """
+        self._entries.clear()
+        self._nbytes = 0
+        if disk and self.disk_dir is not None and os.path.isdir(self.disk_dir):
+            for sub in os.listdir(self.disk_dir):
+                directory = os.path.join(self.disk_dir, sub)
+                for name in os.listdir(directory):
+                    if name.endswith((".pkl", ".tmp")):
+                        os.remove(os.path.join(directory, name))
+
+    def stats(self):
+        """ Aciertos (memoria y disco), fallos, tasa de aciertos, desalojos,
+        entradas y bytes en memoria.
+        """
+        lookups = self.hits + self.disk_hits + self.misses
+        return {"hits": self.hits, "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": ((self.hits + self.disk_hits) / lookups
+                             if lookups else np.nan),
+                "evictions": self.evictions, "entries": len(self._entries),
+                "nbytes": self._nbytes}
+
+
+def memoize(cache, model=None, seeded=False):
+    """ Decorador que guarda los resultados de una función en ``cache``.
+
+    :param cache: Instancia de ``MemoCache``.
+    :param model: Nombre del modelo en la llave (por defecto el módulo y
+        nombre de la función).
+    :param seeded: Si la función simula con el generador global de NumPy
+        (como ``g_prior_sample`` o ``compute_IS_estimator``). En ese caso la
+        función decorada exige el argumento ``seed=`` (entero), que entra en
+        la llave y se pasa a ``np.random.seed`` antes de calcular; el estado
+        del generador global se restaura al terminar, así que llamar a la
+        función decorada no lo altera, haya acierto o no.
+    """
+    def decorator(func):
+        name = model or f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, seed=None, **kwargs):
+            if seeded and seed is None:
+                raise ValueError(f"{name} simula: hay que pasar seed=<entero>")
+
+            def compute():
+                if not seeded:
+                    return func(*args, **kwargs)
+                state = np.random.get_state()
+                np.random.seed(seed)
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    np.random.set_state(state)
+
+            return cache.get_or_compute(content_key(name, args, kwargs, seed),
+                                        compute)
+
+        wrapper.cache = cache
+        return wrapper
+    return decorator
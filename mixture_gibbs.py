@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""Muestreador de Gibbs vectorizado para mezclas de normales univariadas.
+
+Es el modelo de GibbsSample_MixNorm.ipynb (cf. Algoritmo 2.1 en Sudderth 2006):
+
+1. $z_i | \\pi, \\theta \\sim \\text{Cat}(\\pi_k \\mathcal{N}(x_i | \\theta_k, \\sigma^2))$
+2. $\\pi | z \\sim \\text{Dir}(N_k + \\alpha / K)$
+3. $\\theta_k | z \\sim \\mathcal{N}$ con la actualización conjugada de la media.
+
+pero con el estado guardado en arreglos:
+
+- Las asignaciones viven en un arreglo de enteros.
+- Las estadísticas suficientes (conteo y suma por cluster) se calculan con
+  ``np.bincount``.
+- Los $n \\times K$ log-scores se calculan con un solo broadcast.
+- Las asignaciones se muestrean con el truco de Gumbel-max:
+  $\\arg\\max_k (s_{ik} + g_{ik})$, con $g_{ik}$ Gumbel estándar, sigue la
+  distribución categórica con probabilidades $\\propto e^{s_{ik}}$.
+
+``CollapsedNormalMixtureGibbs`` integra $\\pi$ y $\\theta$ y actualiza las
+asignaciones punto por punto; quitar y volver a agregar un punto cuesta $O(1)$
+gracias a ``MixtureSuffStats``, así que cada barrido es $O(nK)$.
+
+Obs: a diferencia del notebook, ``cluster_variance`` se usa como varianza
+(el notebook la pasa como desviación estándar a ``stats.norm.logpdf``).
+"""
+
+import numpy as np
+
+from bayes_datasets import DATASETS, load_columns
+
+GALAXY_PATH = DATASETS["galaxy"].path
+
+
+def load_galaxy(path=GALAXY_PATH):
+    """ Datos de velocidades de galaxias (una columna; el primer renglón se
+    omite como en el notebook). Se leen de la caché de ``bayes_datasets``.
+    """
+    spec = DATASETS["galaxy"]
+    return load_columns(path, spec.names, spec.skip_header)["x"]
+
+
+def gumbel_max(scores, rng):
+    """ Muestra un índice por renglón con probabilidades $\\propto e^{scores}$.
+
+    :param scores: Arreglo (n, K) de log-probabilidades no normalizadas.
+    :param rng: Generador de números aleatorios de NumPy.
+    :return: Arreglo (n,) de enteros en $\\{0, \\ldots, K-1\\}$.
+    """
+    return np.argmax(scores + rng.gumbel(size=scores.shape), axis=1)
+
+
+class MixtureSuffStats:
+    def __init__(self, num_clusters):
+        """ Estadísticas suficientes por cluster: conteo, suma y suma de
+        cuadrados, en arreglos de NumPy.
+
+        :param num_clusters: Número de componentes, $K$.
+        """
+        self.counts = np.zeros(num_clusters, dtype=np.int64)
+        self.sums = np.zeros(num_clusters)
+        self.sumsq = np.zeros(num_clusters)
+
+    @classmethod
+    def from_assignment(cls, data, assignment, num_clusters):
+        """ Calcula las estadísticas desde cero con ``np.bincount``. """
+        stats = cls(num_clusters)
+        stats.counts[:] = np.bincount(assignment, minlength=num_clusters)
+        stats.sums[:] = np.bincount(assignment, weights=data,
+                                    minlength=num_clusters)
+        stats.sumsq[:] = np.bincount(assignment, weights=data * data,
+                                     minlength=num_clusters)
+        return stats
+
+    def add(self, k, x):
+        """ Agrega la observación ``x`` al cluster ``k``. """
+        self.counts[k] += 1
+        self.sums[k] += x
+        self.sumsq[k] += x * x
+
+    def remove(self, k, x):
+        """ Quita la observación ``x`` del cluster ``k``. """
+        self.counts[k] -= 1
+        self.sums[k] -= x
+        self.sumsq[k] -= x * x
+
+
+class NormalMixtureGibbs:
+    def __init__(self, data, num_clusters=3, cluster_variance=0.01, alpha=1.0,
+                 prior_mean=0.0, prior_variance=1.0, cluster_means=None,
+                 rng=None):
+        """ Constructor del muestreador.
+
+        :param data: Arreglo 1-D con las observaciones.
+        :param num_clusters: Número de componentes, $K$.
+        :param cluster_variance: Varianza (conocida) de cada componente.
+        :param alpha: Concentración de la inicial Dirichlet.
+        :param prior_mean: Media de la inicial normal de las medias.
+        :param prior_variance: Varianza de la inicial normal de las medias.
+        :param cluster_means: Medias iniciales; por defecto equiespaciadas en
+            $[-1, 1]$ como en el notebook.
+        :param rng: Generador de NumPy (``np.random.default_rng()`` si es
+            ``None``).
+        """
+        self.rng = np.random.default_rng() if rng is None else rng
+        self.data = np.asarray(data, dtype=float).ravel()
+        self.num_clusters = num_clusters
+        self.cluster_variance = cluster_variance
+        self.alpha = alpha
+        self.prior_mean = prior_mean
+        self.prior_variance = prior_variance
+
+        K = num_clusters
+        self.assignment = self.rng.integers(K, size=self.data.size)
+        self.pi = np.full(K, 1.0 / K)
+        if cluster_means is None:
+            cluster_means = np.linspace(-1, 1, K)
+        self.cluster_means = np.array(cluster_means, dtype=float)
+        self.update_suffstats()
+
+    def update_suffstats(self):
+        """ Recalcula las estadísticas suficientes con ``np.bincount``. """
+        self.stats = MixtureSuffStats.from_assignment(
+            self.data, self.assignment, self.num_clusters)
+
+    @property
+    def counts(self):
+        return self.stats.counts
+
+    @property
+    def sums(self):
+        return self.stats.sums
+
+    @property
+    def suffstat_means(self):
+        """ Media de los puntos de cada cluster (``nan`` si está vacío). """
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.sums / self.counts
+
+    def log_assignment_scores(self):
+        """ $\\log p(z_i = k | \\cdot)$ sin normalizar, de forma (n, K). """
+        var = self.cluster_variance
+        diff = self.data[:, None] - self.cluster_means[None, :]
+        return (np.log(self.pi) - 0.5 * np.log(2 * np.pi * var)
+                - 0.5 * diff * diff / var)
+
+    def update_assignment(self):
+        """ Paso 1: muestrea todas las asignaciones dadas $\\pi$ y $\\theta$. """
+        self.assignment = gumbel_max(self.log_assignment_scores(), self.rng)
+        self.update_suffstats()
+
+    def update_mixture_weights(self):
+        """ Paso 2: $\\pi \\sim \\text{Dir}(N_k + \\alpha / K)$. """
+        self.pi = self.rng.dirichlet(self.counts + self.alpha / self.num_clusters)
+
+    def update_cluster_means(self):
+        """ Paso 3: muestrea todas las medias de su condicional normal. """
+        precision = 1.0 / self.prior_variance + self.counts / self.cluster_variance
+        numerator = (self.prior_mean / self.prior_variance
+                     + self.sums / self.cluster_variance)
+        posterior_mu = numerator / precision
+        self.cluster_means = self.rng.normal(posterior_mu, np.sqrt(1.0 / precision))
+
+    def gibbs_step(self):
+        self.update_assignment()
+        self.update_mixture_weights()
+        self.update_cluster_means()
+
+    def run(self, num_steps):
+        """ Corre ``num_steps`` pasos de Gibbs.
+
+        :param num_steps: Número de pasos.
+        :return: Diccionario con las trazas ``pi`` y ``cluster_means``, cada
+            una de forma (num_steps, K).
+        """
+        K = self.num_clusters
+        trace = {"pi": np.empty((num_steps, K)),
+                 "cluster_means": np.empty((num_steps, K))}
+        for i in range(num_steps):
+            self.gibbs_step()
+            trace["pi"][i] = self.pi
+            trace["cluster_means"][i] = self.cluster_means
+        return trace
+
+
+class CollapsedNormalMixtureGibbs(NormalMixtureGibbs):
+    """ Gibbs colapsado: $\\pi$ y $\\theta$ se integran y cada asignación se
+    muestrea de
+
+    $$
+    p(z_i = k | z_{-i}, x) \\propto (N_k^{-i} + \\alpha / K)
+        \\mathcal{N}(x_i | m_k^{-i}, \\sigma^2 + 1/\\lambda_k^{-i})
+    $$
+
+    con $\\lambda_k = 1/\\tau_0^2 + N_k/\\sigma^2$ y
+    $m_k = (\\mu_0/\\tau_0^2 + S_k/\\sigma^2)/\\lambda_k$, donde $N_k$ y $S_k$ son
+    el conteo y la suma del cluster sin el punto $i$.
+    """
+
+    def update_assignment(self):
+        """ Barrido punto por punto con actualizaciones $O(1)$ de las
+        estadísticas suficientes.
+        """
+        K = self.num_clusters
+        var = self.cluster_variance
+        prior_prec = 1.0 / self.prior_variance
+        prior_term = self.prior_mean * prior_prec
+        a_k = self.alpha / K
+        stats = self.stats
+        counts, sums = stats.counts, stats.sums
+        assignment = self.assignment
+        # Ruido Gumbel de todo el barrido en una sola llamada al generador.
+        noise = self.rng.gumbel(size=(self.data.size, K))
+
+        for i, x in enumerate(self.data):
+            stats.remove(assignment[i], x)
+            prec = prior_prec + counts / var
+            mean = (prior_term + sums / var) / prec
+            pred_var = var + 1.0 / prec
+            diff = x - mean
+            scores = (np.log(counts + a_k) - 0.5 * np.log(pred_var)
+                      - 0.5 * diff * diff / pred_var)
+            k = np.argmax(scores + noise[i])
+            assignment[i] = k
+            stats.add(k, x)
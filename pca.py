@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+"""PCA para matrices grandes: truco de Gram, SVD aleatorizada e incremental.
+
+tutorial_pca.ipynb calcula la descomposición completa de $S = X^TX/N$ (o de
+$XX^T/N$ en ``PCA_high_dim``), lo cual cuesta $O(D^3)$ u $O(N^3)$. Aquí:
+
+- ``pca_gram``: para $N \\ll D$ se descompone la matriz de Gram $N \\times N$,
+  $X_cX_c^T/N = U\\Lambda U^T$, y las componentes son
+  $X_c^TU\\Lambda^{-1/2}/\\sqrt{N}$.
+- ``randomized_pca``: SVD aleatorizada (Halko, Martinsson y Tropp 2011) para
+  las primeras $k$ componentes. Con $\\Omega \\in \\mathbb{R}^{D \\times (k+p)}$
+  gaussiana se forma $Y = (X_cX_c^T)^qX_c\\Omega$, se ortonormaliza
+  $Q = \\text{qr}(Y)$ y se hace la SVD de $Q^TX_c$, que es pequeña. $X$ se
+  recorre por bloques de renglones y nunca se centra en memoria, así que
+  puede ser un ``np.memmap``.
+- ``IncrementalPCA``: actualiza la SVD con mini-lotes (Ross et al. 2008),
+  apilando $[\\Sigma V^T;\\ X_b - \\bar x_b;\\ \\sqrt{nm/(n+m)}(\\bar x - \\bar x_b)]$.
+
+``benchmark`` compara los tres métodos para varios $N$, $D$ y $k$.
+"""
+
+from collections import namedtuple
+import timeit
+
+import numpy as np
+
+PCAResult = namedtuple("PCAResult", "components explained_variance mean")
+
+
+def normalize(X):
+    """ Estandariza las columnas de ``X`` (como en tutorial_pca.ipynb): las
+    columnas con desviación estándar cero se dejan con escala 1.
+
+    :return: Tupla ``(Xbar, mean, std)``.
+    """
+    mu = np.mean(X, axis=0)
+    std = np.std(X, axis=0)
+    std_filled = std.copy()
+    std_filled[std == 0] = 1.
+    return (X - mu) / std_filled, mu, std
+
+
+def _row_chunks(N, chunk_size):
+    for start in range(0, N, chunk_size):
+        yield slice(start, min(start + chunk_size, N))
+
+
+def transform(X, result):
+    """ Coordenadas de ``X`` (N, D) en las componentes, de forma (N, k). """
+    return (np.asarray(X) - result.mean) @ result.components.T
+
+
+def reconstruct(X, result):
+    """ Reconstrucción de ``X`` a partir de sus primeras $k$ componentes. """
+    return transform(X, result) @ result.components + result.mean
+
+
+def pca_gram(X, k, center=True):
+    """ PCA con la matriz de Gram $N \\times N$, para $N \\ll D$.
+
+    :param X: Datos (N, D).
+    :param k: Número de componentes.
+    :param center: Si se resta la media de las columnas.
+    :return: ``PCAResult`` con ``components`` (k, D) ortonormales,
+        ``explained_variance`` (k,) (valores propios de $S$) y ``mean`` (D,).
+    """
+    X = np.asarray(X, dtype=float)
+    N = X.shape[0]
+    mean = X.mean(axis=0) if center else np.zeros(X.shape[1])
+    Xc = X - mean
+    vals, vecs = np.linalg.eigh(Xc @ Xc.T / N)
+    vals, vecs = vals[::-1][:k], vecs[:, ::-1][:, :k]
+    vals = np.maximum(vals, 0)
+    components = (Xc.T @ vecs).T
+    norms = np.sqrt(N * vals)
+    components /= np.where(norms > 0, norms, 1)[:, None]
+    return PCAResult(components, vals, mean)
+
+
+def randomized_pca(X, k, oversample=10, n_iter=4, center=True,
+                   chunk_size=65536, rng=None):
+    """ Primeras $k$ componentes por SVD aleatorizada con iteraciones de
+    potencia.
+
+    Los productos $X_c\\Omega$ y $X_c^TQ$ se calculan por bloques de
+    ``chunk_size`` renglones usando $X_c\\Omega = X\\Omega - 1(\\bar x^T\\Omega)$,
+    de modo que la memoria extra es $O((N + D)(k + p))$. Si ``X`` es de
+    punto flotante (p. ej. ``float32``) los productos se hacen en su
+    precisión y se acumulan en ``float64``.
+
+    :param X: Datos (N, D); puede ser un ``np.memmap``.
+    :param k: Número de componentes.
+    :param oversample: Columnas extra $p$ del bosquejo.
+    :param n_iter: Iteraciones de potencia $q$ (mejoran la precisión cuando el
+        espectro decae lentamente).
+    :param center: Si se resta la media de las columnas.
+    :param chunk_size: Renglones por bloque.
+    :param rng: Generador de NumPy.
+    :return: ``PCAResult``.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    N, D = X.shape
+    dtype = X.dtype if np.issubdtype(X.dtype, np.floating) else np.float64
+    chunks = list(_row_chunks(N, chunk_size))
+    mean = np.zeros(D)
+    if center:
+        for sl in chunks:
+            mean += np.asarray(X[sl]).sum(axis=0, dtype=np.float64)
+        mean /= N
+
+    def times(B):
+        """ $X_cB$, de forma (N, l). """
+        out = np.empty((N, B.shape[1]))
+        shift = mean @ B
+        B = B.astype(dtype)
+        for sl in chunks:
+            out[sl] = np.asarray(X[sl], dtype=dtype) @ B
+        return out - shift
+
+    def times_t(Q):
+        """ $X_c^TQ$, de forma (D, l). """
+        out = np.zeros((D, Q.shape[1]))
+        Q_ = Q.astype(dtype)
+        for sl in chunks:
+            out += np.asarray(X[sl], dtype=dtype).T @ Q_[sl]
+        return out - np.outer(mean, Q.sum(axis=0))
+
+    l = min(k + oversample, N, D)
+    Q, _ = np.linalg.qr(times(rng.standard_normal((D, l))))
+    for _ in range(n_iter):
+        W, _ = np.linalg.qr(times_t(Q))
+        Q, _ = np.linalg.qr(times(W))
+    # B = Q^T X_c = (X_c^T Q)^T, de forma (l, D).
+    B = times_t(Q).T
+    _, s, Vt = np.linalg.svd(B, full_matrices=False)
+    return PCAResult(Vt[:k], s[:k] ** 2 / N, mean)
+
+
+class IncrementalPCA:
+    def __init__(self, num_components):
+        """ PCA incremental a partir de mini-lotes.
+
+        :param num_components: Número de componentes, $k$.
+        """
+        self.num_components = num_components
+        self.n_samples_seen = 0
+        self.mean = None
+        self.components = None
+        self.singular_values = None
+
+    def partial_fit(self, batch):
+        """ Actualiza la media y la SVD con un mini-lote (m, D).
+
+        :return: ``self``.
+        """
+        batch = np.asarray(batch, dtype=float)
+        m = batch.shape[0]
+        n = self.n_samples_seen
+        batch_mean = batch.mean(axis=0)
+        centered = batch - batch_mean
+        if self.components is None:
+            stacked = centered
+            self.mean = batch_mean
+        else:
+            correction = np.sqrt(n * m / (n + m)) * (self.mean - batch_mean)
+            stacked = np.vstack([self.singular_values[:, None] * self.components,
+                                 centered, correction])
+            self.mean = self.mean + m / (n + m) * (batch_mean - self.mean)
+        _, s, Vt = np.linalg.svd(stacked, full_matrices=False)
+        self.components = Vt[:self.num_components]
+        self.singular_values = s[:self.num_components]
+        self.n_samples_seen = n + m
+        return self
+
+    def fit(self, batches):
+        """ Ajusta con un iterable de mini-lotes (p. ej. ``iter_batches``). """
+        for batch in batches:
+            self.partial_fit(batch)
+        return self
+
+    @property
+    def result(self):
+        """ ``PCAResult`` con el estado actual. """
+        return PCAResult(self.components,
+                         self.singular_values ** 2 / self.n_samples_seen,
+                         self.mean)
+
+
+def iter_batches(X, batch_size):
+    """ Recorre ``X`` en mini-lotes de ``batch_size`` renglones. """
+    for sl in _row_chunks(X.shape[0], batch_size):
+        yield X[sl]
+
+
+def time(f, repeat=10):
+    """ Media y desviación estándar del tiempo de ``f()`` (como en
+    tutorial_pca.ipynb).
+    """
+    times = []
+    for _ in range(repeat):
+        start = timeit.default_timer()
+        f()
+        times.append(timeit.default_timer() - start)
+    return np.mean(times), np.std(times)
+
+
+def captured_variance(X, result):
+    """ Fracción de la varianza total de ``X`` que capturan las componentes. """
+    Xc = np.asarray(X, dtype=float) - result.mean
+    return np.sum(np.square(Xc @ result.components.T)) / np.sum(np.square(Xc))
+
+
+def benchmark(sizes, ks, repeat=3, decay=0.9, batch_size=1000,
+              max_gram_n=2000, rng=None):
+    """ Compara ``pca_gram``, ``randomized_pca`` e ``IncrementalPCA``.
+
+    Los datos son $X = ZA$ con $Z$ gaussiana y un espectro que decae como
+    ``decay``$^j$, para que las primeras componentes estén bien definidas.
+
+    :param sizes: Iterable de pares ``(N, D)``.
+    :param ks: Iterable de números de componentes.
+    :param repeat: Repeticiones para medir el tiempo.
+    :param decay: Razón de decaimiento del espectro.
+    :param batch_size: Tamaño de lote de ``IncrementalPCA``.
+    :param max_gram_n: ``pca_gram`` se omite si $N$ es mayor (cuesta
+        $O(N^3)$).
+    :param rng: Generador de NumPy.
+    :return: Lista de diccionarios con ``method``, ``N``, ``D``, ``k``,
+        ``time``, ``time_std`` y ``captured`` (fracción de varianza
+        capturada).
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    methods = {
+        "gram": lambda X, k: pca_gram(X, k),
+        "randomized": lambda X, k: randomized_pca(X, k, rng=rng),
+        "incremental": lambda X, k: IncrementalPCA(k).fit(
+            iter_batches(X, max(batch_size, k))).result,
+    }
+    rows = []
+    for N, D in sizes:
+        scales = decay ** np.arange(D)
+        X = rng.standard_normal((N, D)) * scales
+        X = X @ np.linalg.qr(rng.standard_normal((D, D)))[0]
+        for k in ks:
+            for name, method in methods.items():
+                if name == "gram" and N > max_gram_n:
+                    continue
+                mean, std = time(lambda: method(X, k), repeat)
+                rows.append({"method": name, "N": N, "D": D, "k": k,
+                             "time": mean, "time_std": std,
+                             "captured": captured_variance(X, method(X, k))})
+    return rows
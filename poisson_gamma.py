@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""Modelo Poisson-Gamma con exposición y verificación predictiva posterior.
+
+Es el modelo de datos_aviones.csv en NormModel_BothUnknownParam_BayesInference.Rmd:
+$y_i \\sim \\text{Poisson}(\\lambda_{g(i)} x_i)$, con $x_i$ la exposición
+(``miles_flown``) y $g(i)$ el grupo de la observación, e inicial
+$\\lambda_g \\sim \\text{Gamma}(a, b)$ (tasa $b$). La posterior es
+
+$$
+\\lambda_g | y \\sim \\text{Gamma}\\Big(a + \\sum_{g(i)=g} y_i,\\;
+    b + \\sum_{g(i)=g} x_i\\Big),
+$$
+
+que se actualiza para todos los grupos a la vez con ``np.bincount``. Con
+$a = 1/2$, $b = 0$ y un solo grupo se recupera la posterior
+$\\text{Gamma}(0.5 + n\\bar y, n\\bar x)$ del Rmd.
+
+Las réplicas predictivas $y^{rep} \\sim \\text{Poisson}(\\lambda x)$ se generan
+en una sola llamada de forma (draws, n) en lugar del doble ciclo de R, y las
+p-values $P(T(y^{rep}) \\ge T(y))$ se acumulan por bloques sin guardar todas las
+réplicas.
+"""
+
+import numpy as np
+
+from bayes_datasets import DATASETS, load_columns
+
+AVIONES_PATH = DATASETS["aviones"].path
+
+
+def load_aviones(path=AVIONES_PATH):
+    """ Datos de accidentes aéreos: ``year``, ``fat_acc``, ``pass_deaths`` y
+    ``miles_flown``.
+
+    :return: Diccionario columna -> arreglo (de solo lectura, leído de la
+        caché de ``bayes_datasets``).
+    """
+    return load_columns(path)
+
+
+class PoissonGammaExposure:
+    def __init__(self, a=0.5, b=0.0, num_groups=1):
+        """ Inicial $\\text{Gamma}(a, b)$ para la tasa de cada grupo.
+
+        :param a: Forma inicial (escalar o arreglo de tamaño ``num_groups``).
+        :param b: Tasa inicial (escalar o arreglo de tamaño ``num_groups``).
+        :param num_groups: Número de grupos, $G$.
+        """
+        self.a = np.broadcast_to(np.asarray(a, dtype=float), (num_groups,)).copy()
+        self.b = np.broadcast_to(np.asarray(b, dtype=float), (num_groups,)).copy()
+        self.num_groups = num_groups
+
+    def _groups(self, groups, size):
+        if groups is None:
+            return np.zeros(size, dtype=np.intp)
+        return np.asarray(groups, dtype=np.intp)
+
+    def update(self, counts, exposure, groups=None):
+        """ Actualización conjugada con un lote de observaciones.
+
+        :param counts: Conteos $y_i$.
+        :param exposure: Exposiciones $x_i$.
+        :param groups: Grupo de cada observación (por defecto todas en el 0).
+        :return: ``self``.
+        """
+        counts = np.asarray(counts, dtype=float).ravel()
+        exposure = np.asarray(exposure, dtype=float).ravel()
+        groups = self._groups(groups, counts.size)
+        G = self.num_groups
+        self.a += np.bincount(groups, weights=counts, minlength=G)
+        self.b += np.bincount(groups, weights=exposure, minlength=G)
+        return self
+
+    def mean(self):
+        """ Media posterior de cada tasa, $a / b$. """
+        return self.a / self.b
+
+    def var(self):
+        """ Varianza posterior de cada tasa, $a / b^2$. """
+        return self.a / self.b ** 2
+
+    def sample_rates(self, size=1, rng=None):
+        """ Simulaciones de la posterior de las tasas, de forma (size, G). """
+        rng = np.random.default_rng() if rng is None else rng
+        return rng.gamma(self.a, 1.0 / self.b, size=(size, self.num_groups))
+
+    def posterior_predictive(self, exposure, groups=None, n_draws=1000,
+                             chunk_size=None, rng=None):
+        """ Réplicas predictivas posteriores.
+
+        Cada renglón usa una simulación $\\lambda^{(s)}$ para todas las
+        observaciones: $y^{rep}_{si} \\sim \\text{Poisson}(\\lambda^{(s)}_{g(i)}
+        x_i)$.
+
+        :param exposure: Exposiciones $x_i$ de las observaciones replicadas.
+        :param groups: Grupo de cada observación.
+        :param n_draws: Número de réplicas.
+        :param chunk_size: Si se da, se regresa un generador de bloques de a
+            lo más ``chunk_size`` réplicas en lugar de un solo arreglo.
+        :param rng: Generador de NumPy.
+        :return: Arreglo (n_draws, n) de enteros, o generador de bloques.
+        """
+        rng = np.random.default_rng() if rng is None else rng
+        exposure = np.asarray(exposure, dtype=float).ravel()
+        groups = self._groups(groups, exposure.size)
+
+        def draw(m):
+            rates = self.sample_rates(m, rng)[:, groups]
+            return rng.poisson(rates * exposure)
+
+        if chunk_size is None:
+            return draw(n_draws)
+        return (draw(min(chunk_size, n_draws - start))
+                for start in range(0, n_draws, chunk_size))
+
+    def ppc_pvalues(self, counts, exposure, groups=None, statistics=None,
+                    n_draws=10000, chunk_size=1000, rng=None):
+        """ p-values predictivas posteriores $P(T(y^{rep}) \\ge T(y) | y)$.
+
+        Las réplicas se generan por bloques y de cada bloque solo se guardan
+        los conteos de excedencias, así que la memoria es
+        $O(\\text{chunk\\_size} \\cdot n)$.
+
+        :param counts: Conteos observados $y$.
+        :param exposure: Exposiciones $x$.
+        :param groups: Grupo de cada observación.
+        :param statistics: Diccionario nombre -> función ``T(y, axis)`` que
+            reduce sobre ``axis``; por defecto máximo, mínimo, media y varianza.
+        :param n_draws: Número total de réplicas.
+        :param chunk_size: Réplicas por bloque (``None``: todas en un solo
+            bloque).
+        :param rng: Generador de NumPy.
+        :return: Diccionario nombre -> ``(T(y), p_value)``.
+        """
+        if statistics is None:
+            statistics = {"max": np.max, "min": np.min, "mean": np.mean,
+                          "var": np.var}
+        counts = np.asarray(counts, dtype=float).ravel()
+        observed = {name: T(counts, axis=0) for name, T in statistics.items()}
+        exceed = dict.fromkeys(statistics, 0)
+        for rep in self.posterior_predictive(exposure, groups, n_draws,
+                                             chunk_size or n_draws, rng):
+            for name, T in statistics.items():
+                exceed[name] += np.count_nonzero(T(rep, axis=1) >= observed[name])
+        return {name: (observed[name], exceed[name] / n_draws)
+                for name in statistics}
@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+"""Servicio asyncio que agrupa consultas posteriores en micro-lotes.
+
+Cada consulta a ``posterior_discrete`` o a la actualización Beta-Binomial de
+bayesiana_ejemplo1.py se calcula por separado. ``PosteriorService`` pone las
+consultas en una cola y un trabajador por tipo de consulta las junta: toma
+la primera, espera a lo más ``max_wait`` segundos (o hasta ``max_batch``
+consultas) y hace un solo cálculo vectorizado
+(``posterior_discrete_batch`` o ``BetaBinomial``) cuyos renglones regresa a
+cada llamador. El costo por lote es casi constante, así que el rendimiento
+crece con el tamaño del lote y no con el número de consultas.
+
+- Contrapresión: cada cola admite a lo más ``max_pending`` consultas;
+  ``await service.posterior_discrete(...)`` se bloquea mientras esté llena.
+- ``stats()`` reporta por tipo de consulta el número de lotes, el tamaño
+  medio de lote, el tiempo de cálculo por lote y la latencia de extremo a
+  extremo (mediana y percentil 99) de las consultas recientes.
+
+El cálculo se hace en el hilo del ciclo de eventos: son operaciones de
+NumPy de microsegundos a milisegundos. Ejemplo::
+
+    async def main():
+        async with PosteriorService(p, prior) as service:
+            post = await service.posterior_discrete([11, 16])
+            summary = await service.beta_update(3.26, 7.18, 11, 16)
+"""
+
+import asyncio
+from collections import deque
+import time
+
+import numpy as np
+
+from beta_binomial import BetaBinomial
+from grid_posterior import posterior_discrete_batch
+
+
+class _Batcher:
+    def __init__(self, compute, max_batch, max_wait, max_pending, window):
+        """ Cola con un trabajador que agrupa consultas.
+
+        :param compute: Función lista de consultas -> lista de resultados.
+        """
+        self._compute = compute
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = asyncio.Queue(maxsize=max_pending)
+        self._task = None
+        self._closed = False
+        self._in_flight = []
+        self.num_batches = 0
+        self.num_requests = 0
+        self._compute_time = 0.0
+        self._latencies = deque(maxlen=window)
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """ Detiene el trabajador y cancela las consultas pendientes, tanto
+        las que están en cola como las del lote que se estaba juntando.
+        """
+        self._closed = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        pending = self._in_flight
+        self._in_flight = []
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        for _, future, _ in pending:
+            if not future.done():
+                future.cancel()
+
+    async def submit(self, request):
+        if self._closed:
+            raise RuntimeError("el servicio ya se detuvo")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((request, future, time.perf_counter()))
+        # Si se detuvo mientras esperaba lugar en la cola, nadie la atenderá.
+        if self._closed:
+            future.cancel()
+        return await future
+
+    async def _collect(self):
+        """ Primera consulta y las que lleguen en ``max_wait`` segundos. """
+        batch = self._in_flight = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(),
+                                                    remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            start = time.perf_counter()
+            try:
+                results = self._compute([request for request, _, _ in batch])
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                for (_, future, _), result in zip(batch, results):
+                    if not future.done():
+                        future.set_result(result)
+            self._in_flight = []
+            end = time.perf_counter()
+            self.num_batches += 1
+            self.num_requests += len(batch)
+            self._compute_time += end - start
+            self._latencies.extend(end - t for _, _, t in batch)
+
+    def stats(self):
+        latencies = np.array(self._latencies)
+        p50, p99 = (np.quantile(latencies, [0.5, 0.99]) if latencies.size
+                    else (np.nan, np.nan))
+        return {"batches": self.num_batches, "requests": self.num_requests,
+                "mean_batch_size": (self.num_requests / self.num_batches
+                                    if self.num_batches else np.nan),
+                "mean_compute_time": (self._compute_time / self.num_batches
+                                      if self.num_batches else np.nan),
+                "latency_p50": p50, "latency_p99": p99,
+                "pending": self._queue.qsize()}
+
+
+class PosteriorService:
+    def __init__(self, p, prior, level=0.95, max_batch=1024, max_wait=0.002,
+                 max_pending=10000, window=10000):
+        """ Constructor del servicio.
+
+        :param p: Rejilla de valores de la proporción para
+            ``posterior_discrete``.
+        :param prior: Probabilidades iniciales sobre la rejilla.
+        :param level: Probabilidad del intervalo de credibilidad de
+            ``beta_update``.
+        :param max_batch: Máximo de consultas por lote.
+        :param max_wait: Segundos que se espera a más consultas después de la
+            primera de un lote.
+        :param max_pending: Máximo de consultas en cola por tipo.
+        :param window: Número de latencias recientes que se guardan.
+        """
+        self.p = np.asarray(p, dtype=float)
+        self.prior = np.asarray(prior, dtype=float)
+        self.level = level
+        args = (max_batch, max_wait, max_pending, window)
+        self._batchers = {
+            "posterior_discrete": _Batcher(self._discrete, *args),
+            "beta_update": _Batcher(self._beta, *args),
+        }
+
+    def _discrete(self, requests):
+        return list(posterior_discrete_batch(self.p, self.prior,
+                                             np.array(requests, dtype=float)))
+
+    def _beta(self, requests):
+        a, b, s, f = np.array(requests, dtype=float).T
+        summary = BetaBinomial(a, b).update(s, f).summary(self.level)
+        return [{key: float(values[i]) for key, values in summary.items()}
+                for i in range(len(requests))]
+
+    async def start(self):
+        """ Arranca los trabajadores (dentro de un ciclo de eventos). """
+        for batcher in self._batchers.values():
+            batcher.start()
+        return self
+
+    async def stop(self):
+        """ Detiene los trabajadores; las consultas pendientes se cancelan
+        (sus llamadores reciben ``asyncio.CancelledError``) y las nuevas
+        lanzan ``RuntimeError``.
+        """
+        for batcher in self._batchers.values():
+            await batcher.stop()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    async def posterior_discrete(self, data):
+        """ Posterior en la rejilla para un par (éxitos, fracasos).
+
+        :return: Arreglo (len(p),).
+        """
+        data = tuple(data)
+        # Una consulta mal formada haría fallar a todo su lote.
+        if len(data) != 2:
+            raise ValueError(f"data debe ser un par (éxitos, fracasos), no {data}")
+        return await self._batchers["posterior_discrete"].submit(data)
+
+    async def beta_update(self, a, b, successes, failures):
+        """ Resumen de la posterior $\\mathcal{Beta}(a + s, b + f)$.
+
+        :return: Diccionario con ``mean``, ``var``, ``lower`` y ``upper``.
+        """
+        # Igual que en posterior_discrete: se valida antes de encolar.
+        a, b, successes, failures = (float(v) for v in
+                                     (a, b, successes, failures))
+        if not (a > 0 and b > 0):
+            raise ValueError(f"se requiere a, b > 0, no a={a}, b={b}")
+        if not (successes >= 0 and failures >= 0):
+            raise ValueError("se requiere éxitos y fracasos >= 0, no "
+                             f"{successes}, {failures}")
+        return await self._batchers["beta_update"].submit(
+            (a, b, successes, failures))
+
+    def stats(self):
+        """ Estadísticas por tipo de consulta (ver ``_Batcher.stats``). """
+        return {name: batcher.stats() for name, batcher in self._batchers.items()}
+
+
+async def _client(service, requests, concurrency):
+    """ Cliente local: envía ``requests`` con a lo más ``concurrency``
+    consultas en vuelo.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(data):
+        async with semaphore:
+            return await service.posterior_discrete(data)
+
+    return await asyncio.gather(*(one(data) for data in requests))
+
+
+def benchmark(num_requests=10000, batch_sizes=(1, 16, 256), concurrency=1000,
+              grid_size=1000, rng=None):
+    """ Rendimiento del servicio para varios ``max_batch`` con un cliente
+    local que lanza ``num_requests`` consultas de ``posterior_discrete``.
+
+    :return: Lista de diccionarios con ``max_batch``, ``time``,
+        ``requests_per_s`` y las estadísticas del servicio.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    p = np.linspace(0.0005, 0.9995, grid_size)
+    prior = np.full(grid_size, 1.0 / grid_size)
+    requests = rng.integers(0, 50, size=(num_requests, 2)).tolist()
+
+    async def run(max_batch):
+        async with PosteriorService(p, prior, max_batch=max_batch) as service:
+            start = time.perf_counter()
+            await _client(service, requests, concurrency)
+            elapsed = time.perf_counter() - start
+            return elapsed, service.stats()["posterior_discrete"]
+
+    rows = []
+    for max_batch in batch_sizes:
+        elapsed, stats = asyncio.run(run(max_batch))
+        rows.append({"max_batch": max_batch, "time": elapsed,
+                     "requests_per_s": num_requests / elapsed, **stats})
+    return rows
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""Selección de modelo para regresión polinomial con una sola factorización.
+
+En tutorial_linear_regression.ipynb, para cada grado $K$ y cada ``kappa`` o
+varianza inicial se rehace ``poly_features(X, K)`` y se vuelve a resolver el
+sistema. Aquí la matriz de rasgos $\\Phi$ se construye una vez con el grado
+máximo y se factoriza $\\Phi = QR$. Como $R$ es triangular superior, las
+primeras $K+1$ columnas cumplen $\\Phi_K = Q_K R_K$ con $R_K$ el bloque
+principal de $R$, así que todos los grados comparten $Q$ y $c = Q^Ty$.
+
+Para cada grado se hace la SVD del bloque pequeño $R_K = USV^T$ y, con
+$z = U^Tc_K$, el modelo $y = \\Phi_K\\theta + \\epsilon$,
+$\\epsilon \\sim \\mathcal{N}(0, \\sigma^2 I)$, $\\theta \\sim \\mathcal{N}(0,
+\\alpha^2 I)$ queda diagonal para todas las $\\alpha^2$ a la vez
+($\\lambda = \\sigma^2/\\alpha^2$):
+
+$$
+\\begin{align*}
+\\theta_{MAP} &= V\\,\\text{diag}\\left(\\frac{s_j}{s_j^2 + \\lambda}\\right)z \\\\
+\\log p(y) &= -\\frac{1}{2}\\Big[\\sum_j \\frac{z_j^2}{\\sigma^2 + \\alpha^2s_j^2}
+    + \\frac{\\|y\\|^2 - \\|z\\|^2}{\\sigma^2} + \\sum_j\\log(\\sigma^2 + \\alpha^2s_j^2)
+    + (N - r)\\log\\sigma^2 + N\\log 2\\pi\\Big]
+\\end{align*}
+$$
+
+y el estimador de máxima verosimilitud es el caso $\\lambda = 0$ con los
+valores singulares numéricamente nulos descartados.
+
+Obs: la base de monomios está mal condicionada para grados altos; conviene
+reescalar $x$ a $[-1, 1]$ antes de construir el barrido.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+SweepResult = namedtuple(
+    "SweepResult",
+    "degrees prior_vars theta_mle rss_mle theta_map rss_map log_evidence best")
+
+
+def poly_features(X, K):
+    """ Matriz de rasgos $[x^0, x^1, \\ldots, x^K]$ de forma (N, K+1). """
+    return np.vander(np.asarray(X, dtype=float).ravel(), K + 1, increasing=True)
+
+
+class PolynomialRegressionSweep:
+    def __init__(self, X, y, max_degree, noise_var=1.0, rcond=1e-12):
+        """ Factoriza una vez la matriz de rasgos del grado máximo.
+
+        :param X: Entradas (N,) o (N, 1).
+        :param y: Respuestas (N,) o (N, 1).
+        :param max_degree: Grado máximo, $K_{max}$.
+        :param noise_var: Varianza del ruido, $\\sigma^2$ (conocida, como en el
+            tutorial).
+        :param rcond: Valores singulares menores que ``rcond`` veces el mayor
+            se consideran nulos en el estimador de máxima verosimilitud.
+        """
+        self.max_degree = max_degree
+        self.noise_var = noise_var
+        self.rcond = rcond
+        y = np.asarray(y, dtype=float).ravel()
+        Phi = poly_features(X, max_degree)
+        self.N = y.size
+        self.yy = y @ y
+
+        Q, R = np.linalg.qr(Phi)
+        c = Q.T @ y
+        # Para cada grado: (s, z, Vt) con s y z rellenados con ceros hasta K+1.
+        self._factors = []
+        for K in range(max_degree + 1):
+            m = min(self.N, K + 1)
+            U, s, Vt = np.linalg.svd(R[:m, :K + 1])
+            z = np.zeros(K + 1)
+            z[:m] = U.T @ c[:m]
+            s_full = np.zeros(K + 1)
+            s_full[:s.size] = s
+            self._factors.append((s_full, z, Vt))
+
+    def fit(self, prior_vars, degrees=None):
+        """ MLE, MAP y evidencia para toda la malla grado $\\times$ varianza
+        inicial.
+
+        :param prior_vars: Arreglo (L,) de varianzas iniciales $\\alpha^2$.
+        :param degrees: Grados a evaluar (por defecto $0, \\ldots, K_{max}$).
+        :return: ``SweepResult`` con ``theta_mle`` (n_K, K_max+1) y
+            ``theta_map`` (n_K, L, K_max+1) rellenados con ceros, ``rss_mle``
+            (n_K,), ``rss_map`` y ``log_evidence`` (n_K, L), y ``best`` = el par
+            ``(grado, alpha^2)`` de mayor evidencia.
+        """
+        prior_vars = np.atleast_1d(np.asarray(prior_vars, dtype=float))
+        degrees = (np.arange(self.max_degree + 1) if degrees is None
+                   else np.asarray(degrees))
+        sigma2 = self.noise_var
+        lam = sigma2 / prior_vars
+        P = self.max_degree + 1
+        nK, L = degrees.size, prior_vars.size
+
+        theta_mle = np.zeros((nK, P))
+        rss_mle = np.empty(nK)
+        theta_map = np.zeros((nK, L, P))
+        rss_map = np.empty((nK, L))
+        log_evidence = np.empty((nK, L))
+
+        for i, K in enumerate(degrees):
+            s, z, Vt = self._factors[K]
+            outside = max(self.yy - z @ z, 0.0)
+
+            keep = s > self.rcond * s[0]
+            coef = np.where(keep, z / np.where(keep, s, 1), 0.0)
+            theta_mle[i, :K + 1] = coef @ Vt
+            rss_mle[i] = outside + np.sum(z[~keep] ** 2)
+
+            s2 = s * s
+            denom = s2[None, :] + lam[:, None]
+            theta_map[i, :, :K + 1] = (s * z / denom) @ Vt
+            rss_map[i] = outside + np.sum((z * lam[:, None] / denom) ** 2, axis=1)
+
+            # Las entradas rellenadas (s_j = 0) aportan log(sigma^2) cada una,
+            # así que el determinante completo suma N - K - 1 términos más.
+            var = sigma2 + prior_vars[:, None] * s2[None, :]
+            log_evidence[i] = -0.5 * (
+                np.sum(z * z / var, axis=1) + outside / sigma2
+                + np.sum(np.log(var), axis=1)
+                + (self.N - K - 1) * np.log(sigma2)
+                + self.N * np.log(2 * np.pi))
+
+        i, j = np.unravel_index(np.argmax(log_evidence), log_evidence.shape)
+        return SweepResult(degrees, prior_vars, theta_mle, rss_mle, theta_map,
+                           rss_map, log_evidence, (degrees[i], prior_vars[j]))
+
+    def predict(self, X, degree, prior_var):
+        """ Distribución predictiva de la regresión bayesiana (sin el ruido de
+        observación).
+
+        :param X: Entradas de prueba.
+        :param degree: Grado del polinomio.
+        :param prior_var: Varianza inicial $\\alpha^2$.
+        :return: Tupla ``(mean, var)``, cada una de forma (N_test,).
+        """
+        s, z, Vt = self._factors[degree]
+        lam = self.noise_var / prior_var
+        denom = s * s + lam
+        Phi_V = poly_features(X, degree) @ Vt.T
+        var = self.noise_var * np.sum(Phi_V ** 2 / denom, axis=1)
+        return Phi_V @ (s * z / denom), var
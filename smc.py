@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""Monte Carlo secuencial (SMC) con templado adaptativo de la verosimilitud.
+
+``ImportanceSampler`` (bayesiana_2.py) usa la propuesta una sola vez y los
+pesos degeneran cuando la posterior está lejos de ella. Aquí una población de
+$N$ partículas se mueve de la inicial a la posterior a través de la sucesión
+
+$$
+\\pi_t(\\theta) \\propto \\pi(\\theta) f(y | \\theta)^{\\beta_t}, \\qquad
+0 = \\beta_0 < \\beta_1 < \\cdots < \\beta_T = 1.
+$$
+
+En cada paso:
+
+1. Se elige $\\beta_{t+1}$ por bisección de modo que el tamaño efectivo de
+   muestra de los pesos incrementales $w_i = f(y | \\theta_i)^{\\beta_{t+1} -
+   \\beta_t}$ sea ``target_ess`` $\\cdot N$.
+2. Se acumula la evidencia, $\\log \\hat Z \\mathrel{+}= \\log \\frac{1}{N}
+   \\sum_i w_i$.
+3. Se remuestrea con remuestreo sistemático.
+4. Se rejuvenecen todas las partículas a la vez con ``n_moves`` pasos de
+   Metropolis de caminata aleatoria cuya covarianza es la de la población.
+
+Todos los pasos son operaciones sobre arreglos (N, d), así que
+``log_prior`` y ``log_likelihood`` deben estar vectorizadas sobre las
+partículas.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+from scipy.special import logsumexp
+
+SMCResult = namedtuple("SMCResult", "particles log_evidence betas acceptance")
+
+
+def systematic_resample(weights, rng):
+    """ Remuestreo sistemático: una sola uniforme $u \\sim U(0, 1/N)$ y los
+    puntos $u + i/N$ contra la distribución acumulada de los pesos.
+
+    :param weights: Pesos normalizados (N,).
+    :param rng: Generador de NumPy.
+    :return: Índices (N,) de las partículas elegidas.
+    """
+    n = weights.size
+    positions = (rng.uniform() + np.arange(n)) / n
+    cumulative = np.cumsum(weights)
+    cumulative[-1] = 1.0
+    return np.searchsorted(cumulative, positions)
+
+
+def _ess(log_w):
+    """ $(\\sum w)^2 / \\sum w^2$ en escala logarítmica. """
+    return np.exp(2 * logsumexp(log_w) - logsumexp(2 * log_w))
+
+
+class TemperedSMC:
+    def __init__(self, log_prior, log_likelihood, sample_prior,
+                 n_particles=2000, target_ess=0.5, n_moves=5, rng=None):
+        """ Constructor del muestreador.
+
+        :param log_prior: Función (N, d) -> (N,) con $\\log \\pi(\\theta)$ (puede
+            ser ``-inf`` fuera del soporte).
+        :param log_likelihood: Función (N, d) -> (N,) con
+            $\\log f(y | \\theta)$.
+        :param sample_prior: Función ``(n, rng)`` -> (n, d) con simulaciones
+            de la inicial.
+        :param n_particles: Número de partículas, $N$.
+        :param target_ess: Fracción de $N$ que debe conservar el ESS en cada
+            paso de templado.
+        :param n_moves: Pasos de Metropolis por rejuvenecimiento.
+        :param rng: Generador de NumPy.
+        """
+        self._log_prior = log_prior
+        self._log_likelihood = log_likelihood
+        self._sample_prior = sample_prior
+        self.n_particles = n_particles
+        self.target_ess = target_ess
+        self.n_moves = n_moves
+        self.rng = np.random.default_rng() if rng is None else rng
+
+    def _next_beta(self, beta, loglik):
+        """ Bisección en $\\beta_{t+1} \\in (\\beta_t, 1]$ para el ESS objetivo. """
+        target = self.target_ess * loglik.size
+        if _ess((1.0 - beta) * loglik) >= target:
+            return 1.0
+        lo, hi = beta, 1.0
+        for _ in range(60):
+            mid = 0.5 * (lo + hi)
+            if _ess((mid - beta) * loglik) >= target:
+                lo = mid
+            else:
+                hi = mid
+        return lo if lo > beta else hi
+
+    def _move(self, particles, logprior, loglik, beta, scale):
+        """ ``n_moves`` pasos de Metropolis vectorizados sobre la población.
+
+        :return: ``(particles, logprior, loglik, acceptance)``.
+        """
+        n, d = particles.shape
+        cov = np.atleast_2d(np.cov(particles, rowvar=False))
+        L = np.linalg.cholesky(scale ** 2 * cov + 1e-12 * np.eye(d))
+        accepted = 0
+        for _ in range(self.n_moves):
+            proposal = particles + self.rng.standard_normal((n, d)) @ L.T
+            prop_prior = self._log_prior(proposal)
+            prop_loglik = np.full(n, -np.inf)
+            ok = np.isfinite(prop_prior)
+            prop_loglik[ok] = self._log_likelihood(proposal[ok])
+            log_r = (prop_prior + beta * prop_loglik) - (logprior + beta * loglik)
+            accept = np.log(self.rng.uniform(size=n)) < np.nan_to_num(
+                log_r, nan=-np.inf)
+            particles[accept] = proposal[accept]
+            logprior[accept] = prop_prior[accept]
+            loglik[accept] = prop_loglik[accept]
+            accepted += np.count_nonzero(accept)
+        return particles, logprior, loglik, accepted / (n * self.n_moves)
+
+    def run(self):
+        """ Corre el templado de $\\beta = 0$ a $\\beta = 1$.
+
+        La escala de la propuesta empieza en $2.38/\\sqrt{d}$ y se ajusta en
+        cada paso según la aceptación del paso anterior.
+
+        :return: ``SMCResult`` con las partículas finales (N, d)
+            (equiponderadas), $\\log \\hat Z$, la sucesión de $\\beta_t$ y la
+            aceptación de cada rejuvenecimiento.
+        """
+        N = self.n_particles
+        particles = np.asarray(self._sample_prior(N, self.rng), dtype=float)
+        particles = particles.reshape(N, -1)
+        logprior = self._log_prior(particles)
+        loglik = self._log_likelihood(particles)
+        scale = 2.38 / np.sqrt(particles.shape[1])
+
+        beta, log_evidence = 0.0, 0.0
+        betas, acceptance = [beta], []
+        while beta < 1.0:
+            new_beta = self._next_beta(beta, loglik)
+            log_w = (new_beta - beta) * loglik
+            log_evidence += logsumexp(log_w) - np.log(N)
+            beta = new_beta
+            betas.append(beta)
+
+            idx = systematic_resample(np.exp(log_w - logsumexp(log_w)), self.rng)
+            particles, logprior, loglik = particles[idx], logprior[idx], loglik[idx]
+            particles, logprior, loglik, rate = self._move(
+                particles, logprior, loglik, beta, scale)
+            acceptance.append(rate)
+            scale *= np.exp(rate - 0.3)
+
+        return SMCResult(particles, log_evidence, np.array(betas),
+                         np.array(acceptance))
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""Verosimilitud Weibull vectorizada con forma y escala desconocidas.
+
+Es el modelo de ``GammaInvIS`` (bayesiana_2.py) y de
+ParameterExpectation_WeibullModel_MonteCarlo.Rmd, con densidad
+
+$$
+f(y | \\beta, \\theta) = \\frac{\\beta}{\\theta}\\left(\\frac{y}{\\theta}\\right)^{\\beta-1}
+    e^{-(y/\\theta)^\\beta}.
+$$
+
+``WeibullLikelihood`` guarda $n$ y $\\sum\\log y_i$ una sola vez, y evalúa
+
+$$
+\\log f(y | \\beta, \\theta) = n\\log\\beta - n\\beta\\log\\theta
+    + (\\beta - 1)\\sum_i\\log y_i - \\theta^{-\\beta}\\sum_i y_i^\\beta
+$$
+
+para arreglos de $(\\beta, \\theta)$ con broadcasting; $\\log\\sum_i y_i^\\beta$ se
+calcula con ``logsumexp`` sobre $\\beta\\log y_i$.
+
+Con $\\phi = \\theta^\\beta$ la verosimilitud es proporcional a
+$\\phi^{-n}e^{-\\sum y_i^\\beta/\\phi}$, así que con inicial
+$\\phi \\sim \\text{Gamma-Inv}(a, b)$
+
+$$
+\\phi | \\beta, y \\sim \\text{Gamma-Inv}\\Big(a + n, b + \\sum_i y_i^\\beta\\Big),
+$$
+
+que con $\\beta = 1$ es la posterior de bayesiana_2.py. Integrando $\\phi$ se
+obtiene la marginal de $\\beta$; con $a = b = 0$ (inicial $\\propto 1/\\phi$)
+es la función ``pv`` del Rmd salvo la inicial de $\\beta$.
+"""
+
+import numpy as np
+from scipy.special import gammaln, logsumexp
+
+
+class WeibullLikelihood:
+    def __init__(self, y, block_size=1_000_000):
+        """ Constructor.
+
+        :param y: Observaciones positivas.
+        :param block_size: Número máximo de elementos $\\beta \\times n$ que se
+            forman a la vez al calcular $\\log\\sum_i y_i^\\beta$.
+        """
+        self.y = np.asarray(y, dtype=float).ravel()
+        self.n = self.y.size
+        self.log_y = np.log(self.y)
+        self.sum_log_y = self.log_y.sum()
+        self.block_size = block_size
+
+    def log_sum_pow(self, beta):
+        """ $\\log\\sum_i y_i^\\beta$ para un arreglo de $\\beta$ (misma forma). """
+        beta = np.asarray(beta, dtype=float)
+        flat = beta.ravel()
+        out = np.empty(flat.size)
+        step = max(1, self.block_size // self.n)
+        for start in range(0, flat.size, step):
+            b = flat[start:start + step]
+            out[start:start + step] = logsumexp(b[:, None] * self.log_y, axis=1)
+        return out.reshape(beta.shape)
+
+    def log_likelihood(self, beta, theta):
+        """ $\\log f(y | \\beta, \\theta)$ con broadcasting entre ``beta`` y
+        ``theta``.
+        """
+        beta = np.asarray(beta, dtype=float)
+        log_theta = np.log(theta)
+        return (self.n * np.log(beta) - self.n * beta * log_theta
+                + (beta - 1) * self.sum_log_y
+                - np.exp(self.log_sum_pow(beta) - beta * log_theta))
+
+    def conditional_phi(self, beta, a, b):
+        """ Parámetros $(a + n, b + \\sum y_i^\\beta)$ de la condicional
+        Gamma-Inv de $\\phi = \\theta^\\beta$.
+        """
+        return a + self.n, b + np.exp(self.log_sum_pow(beta))
+
+    def sample_theta(self, beta, a, b, rng=None):
+        """ Simula $\\theta = \\phi^{1/\\beta}$ con $\\phi | \\beta, y$ Gamma-Inv,
+        una simulación por cada entrada de ``beta``.
+        """
+        rng = np.random.default_rng() if rng is None else rng
+        beta = np.asarray(beta, dtype=float)
+        shape, rate = self.conditional_phi(beta, a, b)
+        phi = rate / rng.gamma(shape, size=beta.shape)
+        return phi ** (1.0 / beta)
+
+    def log_marginal_beta(self, beta, a, b):
+        """ $\\log p(y | \\beta)$ con $\\phi$ integrada (salvo la constante
+        $b^a/\\Gamma(a)$ cuando $a = b = 0$).
+        """
+        beta = np.asarray(beta, dtype=float)
+        shape, rate = self.conditional_phi(beta, a, b)
+        out = (self.n * np.log(beta) + (beta - 1) * self.sum_log_y
+               + gammaln(shape) - shape * np.log(rate))
+        if a > 0:
+            out = out + a * np.log(b) - gammaln(a)
+        return out
+
+    def grid_posterior(self, betas, thetas, log_prior=None):
+        """ Posterior conjunta normalizada en la malla ``betas`` $\\times$
+        ``thetas``, sin ciclos de Python.
+
+        :param betas: Valores de $\\beta$ (B,).
+        :param thetas: Valores de $\\theta$ (T,).
+        :param log_prior: Función ``(beta, theta)`` -> log-densidad inicial con
+            broadcasting; por defecto plana.
+        :return: Arreglo (B, T) de probabilidades que suman 1.
+        """
+        beta = np.asarray(betas, dtype=float)[:, None]
+        theta = np.asarray(thetas, dtype=float)[None, :]
+        log_post = self.log_likelihood(beta, theta)
+        if log_prior is not None:
+            log_post = log_post + log_prior(beta, theta)
+        post = np.exp(log_post - np.max(log_post))
+        return post / post.sum()
+
+    def sample(self, num_steps, a, b, beta_1=1.0, delta=0.1, num_chains=1,
+               log_prior_beta=None, rng=None):
+        """ Muestreador por bloques para $(\\beta, \\theta)$.
+
+        En cada paso, para todas las cadenas a la vez:
+
+        1. Metropolis de caminata aleatoria en $\\log\\beta$ con la marginal
+           $p(y | \\beta)\\pi(\\beta)$ ($\\phi$ integrada).
+        2. $\\theta | \\beta, y$ exacto a partir de la condicional Gamma-Inv.
+
+        :param num_steps: Número de pasos.
+        :param a: Forma de la inicial Gamma-Inv de $\\phi$.
+        :param b: Escala de la inicial Gamma-Inv de $\\phi$.
+        :param beta_1: Valor inicial de $\\beta$ (escalar o por cadena).
+        :param delta: Desviación de la propuesta en $\\log\\beta$.
+        :param num_chains: Número de cadenas independientes.
+        :param log_prior_beta: Log-densidad inicial de $\\beta$ (vectorizada);
+            por defecto plana.
+        :param rng: Generador de NumPy.
+        :return: Diccionario con ``beta``, ``theta`` de forma
+            (num_steps, num_chains) y ``acep_rate`` por cadena.
+        """
+        rng = np.random.default_rng() if rng is None else rng
+        if log_prior_beta is None:
+            log_prior_beta = np.zeros_like
+
+        def log_target(beta):
+            # El jacobiano de la propuesta en log(beta) es log(beta).
+            return (self.log_marginal_beta(beta, a, b) + log_prior_beta(beta)
+                    + np.log(beta))
+
+        beta = np.broadcast_to(np.asarray(beta_1, dtype=float),
+                               (num_chains,)).copy()
+        current = log_target(beta)
+        trace = {"beta": np.empty((num_steps, num_chains)),
+                 "theta": np.empty((num_steps, num_chains))}
+        accepted = np.zeros(num_chains)
+        for i in range(num_steps):
+            proposal = beta * np.exp(delta * rng.standard_normal(num_chains))
+            new = log_target(proposal)
+            accept = np.log(rng.uniform(size=num_chains)) < new - current
+            beta = np.where(accept, proposal, beta)
+            current = np.where(accept, new, current)
+            accepted += accept
+            trace["beta"][i] = beta
+            trace["theta"][i] = self.sample_theta(beta, a, b, rng)
+        trace["acep_rate"] = accepted / num_steps
+        return trace